@@ -0,0 +1,30 @@
+import os
+
+# چه کسانی می‌توانند از ربات استفاده کنند
+#   ACCESS_MODE=owner      فقط OWNER_ID (پیش‌فرض، رفتار قبلی)
+#   ACCESS_MODE=allowlist  OWNER_ID و شناسه‌های ALLOWED_USERS (جداشده با کاما)
+#   ACCESS_MODE=open       همه کاربران
+# داده‌ها، کش و وضعیت همه بر اساس user_id جدا هستند؛ MAX_WORDS_PER_USER سقف کلمه‌های هر کاربر است (0 = بدون سقف).
+ACCESS_MODE = os.getenv("ACCESS_MODE", "owner").lower()
+OWNER_ID = int(os.getenv("OWNER_ID") or 0)
+ALLOWED_USERS = {int(u) for u in os.getenv("ALLOWED_USERS", "").replace(" ", "").split(",") if u}
+MAX_WORDS_PER_USER = int(os.getenv("MAX_WORDS_PER_USER", "0"))
+
+
+def is_owner(user_id):
+    return user_id == OWNER_ID
+
+
+def is_allowed(user_id):
+    if ACCESS_MODE == "open":
+        return True
+    if ACCESS_MODE == "allowlist":
+        return user_id == OWNER_ID or user_id in ALLOWED_USERS
+    return user_id == OWNER_ID
+
+
+def word_quota(user_id):
+    # صاحب ربات سقف ندارد
+    if is_owner(user_id) or MAX_WORDS_PER_USER <= 0:
+        return None
+    return MAX_WORDS_PER_USER
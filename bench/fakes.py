@@ -0,0 +1,308 @@
+import json
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _size(value):
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode())
+
+
+class FakeSupabase:
+    """جایگزین درون‌حافظه‌ای کلاینت supabase با همان زنجیره from_().select().eq()...execute().
+
+    تعداد رفت‌وبرگشت‌ها و حجم داده ردوبدل‌شده (JSON) را می‌شمارد. rtt اختیاری تأخیر
+    شبکه را برای هر execute شبیه‌سازی می‌کند.
+    """
+
+    def __init__(self, rtt=0.0):
+        self.tables = {"words": [], "bot_user_state": []}
+        self.counters = {}
+        self.rtt = rtt
+        self.round_trips = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def reset_counters(self):
+        self.round_trips = 0
+        self.bytes = 0
+
+    def from_(self, table):
+        return FakeQuery(self, table)
+
+    table = from_
+
+    def rpc(self, fn, params):
+        return FakeRpc(self, fn, params)
+
+    def _account(self, request, response):
+        if self.rtt:
+            time.sleep(self.rtt)
+        with self._lock:
+            self.round_trips += 1
+            self.bytes += _size(request) + _size(response)
+        return SimpleNamespace(data=response)
+
+    # --- توابع RPC (migrations/*.sql) ---
+
+    def _insert_word(self, p_user_id, p_word, p_meaning, p_category, p_max_words=None):
+        rows = [w for w in self.tables["words"] if w["user_id"] == p_user_id]
+        live = [w for w in rows if w.get("deleted_at") is None]
+        if p_max_words is not None and len(live) >= p_max_words:
+            raise Exception("word_quota_exceeded")
+        index = self.counters.get(p_user_id, max((w["index"] for w in rows), default=0)) + 1
+        self.counters[p_user_id] = index
+        row = new_word(p_user_id, index, p_word, p_meaning, p_category)
+        self.tables["words"].append(row)
+        return [dict(row)]
+
+    def _append_example(self, p_user_id, p_index, p_example):
+        for w in self.tables["words"]:
+            if w["user_id"] == p_user_id and w["index"] == p_index:
+                w["examples"] = (w.get("examples") or []) + [p_example]
+                w["updated_at"] = _now()
+                return len(w["examples"])
+        return None
+
+    def _reserve_indexes(self, p_user_id, p_count, p_max_words=None):
+        rows = [w for w in self.tables["words"] if w["user_id"] == p_user_id]
+        live = [w for w in rows if w.get("deleted_at") is None]
+        if p_max_words is not None and len(live) + p_count > p_max_words:
+            raise Exception("word_quota_exceeded")
+        last = self.counters.get(p_user_id, max((w["index"] for w in rows), default=0))
+        self.counters[p_user_id] = last + p_count
+        return last + 1
+
+    def _insert_words(self, p_user_id, p_rows, p_max_words=None):
+        # مثل تراکنش واقعی: شمارنده فقط وقتی جلو می‌رود که همه ردیف‌ها معتبر باشند
+        counters = dict(self.counters)
+        first = self._reserve_indexes(p_user_id, len(p_rows), p_max_words)
+        rows = []
+        for i, row in enumerate(p_rows):
+            if not row.get("word") or not row.get("meaning"):
+                self.counters = counters
+                raise Exception("null value in column violates not-null constraint")
+            rows.append({**new_word(p_user_id, first + i, row["word"], row["meaning"], row.get("category")),
+                         "examples": list(row.get("examples") or [])})
+        self.tables["words"].extend(rows)
+        return first
+
+    def _random_words(self, p_user_id, p_count):
+        rows = [w for w in self.tables["words"] if w["user_id"] == p_user_id and w.get("deleted_at") is None]
+        sample = random.sample(rows, min(p_count, len(rows)))
+        return [{"index": w["index"], "word": w["word"], "meaning": w["meaning"]} for w in sample]
+
+    def _apply_reviews(self, p_user_id, p_reviews):
+        by_index = {r["index"]: r for r in p_reviews}
+        count = 0
+        for w in self.tables["words"]:
+            if w["user_id"] == p_user_id and w["index"] in by_index:
+                w.update(by_index[w["index"]], updated_at=_now())
+                count += 1
+        return count
+
+
+class FakeRpc:
+    def __init__(self, db, fn, params):
+        self.db = db
+        self.fn = fn
+        self.params = params
+        self.http_method = "POST"
+        self.path = f"/rpc/{fn}"
+
+    def execute(self):
+        with self.db._lock:
+            result = getattr(self.db, "_" + self.fn)(**self.params)
+        return self.db._account(self.params, result)
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self.path = f"/{table}"
+        self.http_method = "GET"
+        self.op = "select"
+        self.columns = None
+        self.payload = None
+        self.filters = []
+        self.orders = []
+        self.limit_ = None
+        self.returning = "representation"
+
+    def select(self, columns="*"):
+        self.columns = None if columns == "*" else [c.strip() for c in columns.split(",")]
+        return self
+
+    def insert(self, payload, returning="representation"):
+        self.op, self.payload, self.http_method = "insert", payload, "POST"
+        self.returning = returning
+        return self
+
+    def upsert(self, payload):
+        self.op, self.payload, self.http_method = "upsert", payload, "POST"
+        return self
+
+    def update(self, payload):
+        self.op, self.payload, self.http_method = "update", payload, "PATCH"
+        return self
+
+    def delete(self):
+        self.op, self.http_method = "delete", "DELETE"
+        return self
+
+    def _filter(self, column, test):
+        self.filters.append(lambda row: column in row and row[column] is not None and test(row[column]))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, lambda v: v == value)
+
+    def lt(self, column, value):
+        return self._filter(column, lambda v: v < value)
+
+    def lte(self, column, value):
+        return self._filter(column, lambda v: v <= value)
+
+    def gt(self, column, value):
+        return self._filter(column, lambda v: v > value)
+
+    def gte(self, column, value):
+        return self._filter(column, lambda v: v >= value)
+
+    def is_(self, column, value):
+        # فقط is.null در کد ربات استفاده می‌شود
+        self.filters.append(lambda row: row.get(column) is None)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        return self._filter(column, lambda v: v in values)
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, size):
+        self.limit_ = size
+        return self
+
+    def _project(self, row):
+        if self.columns is None:
+            return dict(row)
+        return {c: row.get(c) for c in self.columns}
+
+    def execute(self):
+        with self.db._lock:
+            data = self._execute(self.db.tables.setdefault(self.table, []))
+        return self.db._account(self.payload, data)
+
+    def _execute(self, rows):
+        if self.op in ("insert", "upsert"):
+            payload = self.payload if isinstance(self.payload, list) else [self.payload]
+            if self.op == "upsert":
+                keys = {r.get("user_id") for r in payload}
+                rows[:] = [r for r in rows if r.get("user_id") not in keys]
+            if self.table == "words":
+                # مقادیر پیش‌فرض ستون‌ها، مثل دیتابیس واقعی
+                payload = [{**new_word(None, None, None, None, None), **r} for r in payload]
+            rows.extend(dict(r) for r in payload)
+            return [] if self.returning == "minimal" else [dict(r) for r in payload]
+
+        matched = [r for r in rows if all(f(r) for f in self.filters)]
+        if self.op == "update":
+            for r in matched:
+                r.update(self.payload)
+                if self.table == "words":
+                    r["updated_at"] = _now()  # trigger words_touch_updated_at
+            return [dict(r) for r in matched]
+        if self.op == "delete":
+            rows[:] = [r for r in rows if r not in matched]
+            return matched
+
+        for column, desc in reversed(self.orders):
+            matched.sort(key=lambda r: r.get(column), reverse=desc)
+        if self.limit_ is not None:
+            matched = matched[:self.limit_]
+        return [self._project(r) for r in matched]
+
+
+def new_word(user_id, index, word, meaning, category, examples=None):
+    return {
+        "user_id": user_id,
+        "index": index,
+        "word": word,
+        "meaning": meaning,
+        "category": category,
+        "examples": examples or [],
+        "due_at": "2000-01-01T00:00:00+00:00",
+        "ease": 2.5,
+        "interval_days": 0,
+        "reps": 0,
+        "updated_at": _now(),
+        "deleted_at": None,
+    }
+
+
+def synthetic_words(user_id, count, categories, seed=0):
+    rng = random.Random(seed)
+    words = []
+    for i in range(1, count + 1):
+        examples = [f"Beispielsatz {j} für Wort {i}." for j in range(rng.randint(0, 3))]
+        words.append(new_word(user_id, i, f"Wort{i}", f"معنی {i}", categories[i % len(categories)], examples))
+    return words
+
+
+class FakeBot:
+    """Bot و Message ضبط‌کننده: هر ارسال به تلگرام فقط ثبت می‌شود."""
+
+    def __init__(self):
+        self.calls = []
+        self.bytes = 0
+
+    def reset_counters(self):
+        self.calls = []
+        self.bytes = 0
+
+    def _record(self, method, size):
+        self.calls.append(method)
+        self.bytes += size
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self._record("sendMessage", len(text.encode()))
+        return FakeMessage(self, chat_id)
+
+
+class FakeMessage:
+    def __init__(self, bot, chat_id, text=""):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.text = text
+        self.document = None
+
+    async def reply_text(self, text, **kwargs):
+        self.bot._record("sendMessage", len(text.encode()))
+        return FakeMessage(self.bot, self.chat_id, text)
+
+    async def reply_document(self, document, filename=None, **kwargs):
+        size = len(document.getvalue()) if hasattr(document, "getvalue") else len(str(document))
+        self.bot._record("sendDocument", size)
+        message = FakeMessage(self.bot, self.chat_id)
+        message.document = SimpleNamespace(file_id=f"file-{len(self.bot.calls)}")
+        return message
+
+
+def make_update(bot, user_id, text=""):
+    user = SimpleNamespace(id=user_id)
+    message = FakeMessage(bot, user_id, text)
+    return SimpleNamespace(effective_user=user, message=message, callback_query=None)
+
+
+def make_context(bot, args=None, user_data=None):
+    return SimpleNamespace(bot=bot, args=args or [], user_data=user_data if user_data is not None else {})
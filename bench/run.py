@@ -0,0 +1,153 @@
+"""بنچمارک آفلاین هندلرهای main.py با Supabase و Bot جعلی.
+
+اجرا از ریشه پروژه:
+
+    python -m bench.run
+    python -m bench.run --sizes 100 1000 --handlers list_words quiz --rtt-ms 30
+    python -m bench.run --backend sqlite
+
+برای هر هندلر و هر اندازه واژگان، یک اجرای سرد (کش خالی) و یک اجرای گرم (بلافاصله بعد از آن)
+اندازه‌گیری می‌شود: زمان، تعداد رفت‌وبرگشت Supabase، بایت‌های Supabase و تلگرام، و حافظه اوج.
+
+حافظه اوج با tracemalloc و فقط با --memory اندازه‌گیری می‌شود، چون زمان اجرا را چند برابر می‌کند.
+خروجی DOCX بالاتر از --export-limit کلمه اجرا نمی‌شود (ساخت سند با python-docx بسیار کند است).
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tracemalloc
+
+BENCH_USER_ID = 1
+
+os.environ.setdefault("OWNER_ID", str(BENCH_USER_ID))
+
+import db  # noqa: E402
+import storage  # noqa: E402
+import main  # noqa: E402
+import docx_export  # noqa: E402
+from bench.fakes import FakeSupabase, FakeBot, make_update, make_context, synthetic_words  # noqa: E402
+
+SIZES = [100, 1_000, 10_000, 100_000]
+
+
+async def _save_word(update, context):
+    await main.save_word(update.effective_user.id, "Bench", "بنچ", "Nomen")
+
+
+HANDLERS = {
+    "list_words": (main.list_words, []),
+    "show_all_words": (main.show_all_words, []),
+    "quiz": (main.quiz, []),
+    "export_all": (main.export_all, []),
+    "export_words": (main.export_words, [str(i) for i in range(1, 11)]),
+    "save_word": (_save_word, []),
+}
+
+
+async def measure(fake, bot, handler, args, memory):
+    fake.reset_counters()
+    bot.reset_counters()
+    update = make_update(bot, BENCH_USER_ID)
+    context = make_context(bot, args)
+
+    if memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    await handler(update, context)
+    elapsed = time.perf_counter() - started
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+        tracemalloc.stop()
+
+    return {
+        "ms": elapsed * 1000,
+        "round_trips": fake.round_trips,
+        "db_kb": fake.bytes / 1024,
+        "tg_calls": len(bot.calls),
+        "tg_kb": bot.bytes / 1024,
+        "peak_mb": peak,
+    }
+
+
+EXPORT_HANDLERS = {"export_all"}
+
+
+class SQLiteCounters:
+    """همان شمارنده‌های FakeSupabase برای SQLiteStorage؛ رفت‌وبرگشت = تعداد کوئری، بدون شبکه."""
+
+    def __init__(self, store):
+        self.store = store
+        self.bytes = 0
+
+    @property
+    def round_trips(self):
+        return self.store.queries
+
+    def reset_counters(self):
+        self.store.queries = 0
+
+
+async def make_backend(backend, size, rtt):
+    words = synthetic_words(str(BENCH_USER_ID), size, main.CATEGORIES)
+    if backend == "sqlite":
+        db.backend = storage.SQLiteStorage(":memory:")
+        rows = [{k: w[k] for k in ("word", "meaning", "category", "examples")} for w in words]
+        if rows:
+            await db.backend.insert_words_bulk(str(BENCH_USER_ID), rows, None)
+        return SQLiteCounters(db.backend)
+    fake = FakeSupabase(rtt=rtt)
+    fake.tables["words"] = words
+    db.backend = storage.SupabaseStorage(client=fake)
+    return fake
+
+
+async def run(sizes, handlers, rtt, memory=False, export_limit=10_000, backend="fake"):
+    rows = []
+    for size in sizes:
+        for name in handlers:
+            handler, args = HANDLERS[name]
+            if name in EXPORT_HANDLERS and size > export_limit:
+                print(f"{size:>7} {name:<15} skipped (> --export-limit {export_limit})", flush=True)
+                continue
+            fake = await make_backend(backend, size, rtt)
+            db.cache.invalidate(str(BENCH_USER_ID))
+            docx_export._sent.clear()
+            bot = FakeBot()
+
+            for phase in ("cold", "warm"):
+                result = await measure(fake, bot, handler, args, memory)
+                rows.append({"size": size, "handler": name, "phase": phase, **result})
+                print_row(rows[-1])
+    return rows
+
+
+HEADER = f"{'size':>7} {'handler':<15} {'phase':<5} {'ms':>9} {'rt':>4} {'db_kb':>9} {'tg':>4} {'tg_kb':>9} {'peak_mb':>8}"
+
+
+def print_row(r):
+    peak = "-" if r["peak_mb"] is None else f"{r['peak_mb']:.1f}"
+    print(f"{r['size']:>7} {r['handler']:<15} {r['phase']:<5} {r['ms']:>9.1f} {r['round_trips']:>4} "
+          f"{r['db_kb']:>9.1f} {r['tg_calls']:>4} {r['tg_kb']:>9.1f} {peak:>8}", flush=True)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Offline handler benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--handlers", nargs="+", choices=list(HANDLERS), default=list(HANDLERS))
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="simulated Supabase round-trip latency")
+    parser.add_argument("--memory", action="store_true", help="measure peak memory with tracemalloc (slow)")
+    parser.add_argument("--backend", choices=["fake", "sqlite"], default="fake",
+                        help="fake Supabase (counts JSON bytes) or a real in-memory SQLiteStorage")
+    parser.add_argument("--export-limit", type=int, default=10_000, help="largest vocabulary for export_all")
+    options = parser.parse_args(argv)
+
+    print(HEADER)
+    asyncio.run(run(options.sizes, options.handlers, options.rtt_ms / 1000, options.memory, options.export_limit,
+                    options.backend))
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,101 @@
+import time
+from collections import OrderedDict
+
+
+class WordCache:
+    """کش درون‌حافظه‌ای ردیف‌های words برای هر کاربر، با TTL و سقف تعداد کاربران و کل ردیف‌ها (LRU).
+
+    بعد از TTL ردیف‌ها دور ریخته نمی‌شوند: stale() آن‌ها را با cursor آخرین همگام‌سازی برمی‌گرداند
+    تا فقط تغییرات بعد از آن خوانده و با merge() اعمال شوند. هر full_sync ثانیه یک بار کل واژگان
+    دوباره خوانده می‌شود (حذف‌های سخت یا تراکنش‌هایی که دیر commit شده‌اند).
+    """
+
+    def __init__(self, ttl=300, max_users=256, max_rows=200000, full_sync=3600):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.max_rows = max_rows
+        self.full_sync = full_sync
+        # user_id -> [expires_at, rows مرتب بر اساس index, cursor, زمان آخرین خواندن کامل]
+        self._entries = OrderedDict()
+        self._rows = 0
+
+    def get(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        self._entries.move_to_end(user_id)
+        return entry[1]
+
+    def stale(self, user_id):
+        """(rows, cursor) برای همگام‌سازی تدریجی؛ None اگر چیزی نیست یا وقت خواندن کامل است."""
+        entry = self._entries.get(user_id)
+        if entry is None or entry[2] is None or entry[3] + self.full_sync < time.monotonic():
+            return None
+        return entry[1], entry[2]
+
+    def set(self, user_id, rows, cursor=None):
+        self.invalidate(user_id)
+        now = time.monotonic()
+        self._entries[user_id] = [now + self.ttl, list(rows), cursor, now]
+        self._rows += len(rows)
+        self._evict()
+
+    def merge(self, user_id, changed, cursor, since):
+        """ردیف‌های تغییرکرده (و حذف‌شده با deleted_at) را روی کش کاربر اعمال می‌کند و آن را تازه می‌کند.
+
+        اگر در این فاصله کش کاربر evict یا با cursor دیگری جایگزین شده باشد None برمی‌گرداند.
+        """
+        entry = self._entries.get(user_id)
+        if entry is None or entry[2] != since:
+            return None
+        rows = entry[1]
+        if changed:
+            by_index = {w["index"]: w for w in rows}
+            for w in changed:
+                if w.get("deleted_at"):
+                    by_index.pop(w["index"], None)
+                else:
+                    by_index[w["index"]] = {k: v for k, v in w.items() if k != "deleted_at"}
+            rows = sorted(by_index.values(), key=lambda w: w["index"])
+            self._rows += len(rows) - len(entry[1])
+            entry[1] = rows
+        entry[0] = time.monotonic() + self.ttl
+        entry[2] = cursor
+        self._entries.move_to_end(user_id)
+        self._evict()
+        return rows
+
+    def _evict(self):
+        # کاربرانی که دیرتر از همه استفاده شده‌اند اول حذف می‌شوند؛ آخرین کاربر همیشه می‌ماند
+        while len(self._entries) > 1 and (len(self._entries) > self.max_users or self._rows > self.max_rows):
+            _, entry = self._entries.popitem(last=False)
+            self._rows -= len(entry[1])
+
+    def add(self, user_id, row):
+        rows = self.get(user_id)
+        if rows is None:
+            return
+        rows.append(row)
+        self._rows += 1
+        if len(rows) > 1 and rows[-2].get("index", 0) > row.get("index", 0):
+            rows.sort(key=lambda w: w.get("index", 0))
+
+    def update(self, user_id, index, fields):
+        rows = self.get(user_id)
+        if rows is None:
+            return
+        for i, w in enumerate(rows):
+            if w.get("index") == index:
+                rows[i] = {**w, **fields}
+                return
+
+    def expire(self, user_id):
+        """کش را کهنه علامت می‌زند؛ خواندن بعدی فقط تغییرات از cursor را می‌گیرد."""
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            entry[0] = 0
+
+    def invalidate(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._rows -= len(entry[1])
@@ -0,0 +1,20 @@
+# قالب فشرده و نسخه‌دار callback_data: "<prefix><version>:<part>:<part>..."
+# همیشه زیر محدودیت ۶۴ بایتی تلگرام می‌ماند، چون متن کلمه‌ها داخلش نمی‌رود.
+
+VERSION = "1"
+
+QUIZ = "q"      # q1:<session id>:<question no>:<option id>
+CATEGORY = "c"  # c1:<category id>
+LIST = "l"      # l1:<category id یا ->:<n|p>:<cursor>
+
+
+def encode(prefix, *parts):
+    return ":".join([prefix + VERSION, *map(str, parts)])
+
+
+def decode(data):
+    return data.split(":")[1:]
+
+
+def pattern(prefix):
+    return f"^{prefix}{VERSION}:"
@@ -0,0 +1,164 @@
+import os
+import random
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from cache import WordCache
+import storage
+from storage import QuotaExceeded, PROJECTIONS  # noqa: F401
+
+# API داده برای هندلرها: کش write-through روی یکی از backendهای storage.py (STORAGE_BACKEND)
+# خواندن‌ها از حافظه، فقط نوشتن‌ها و cache miss به backend می‌روند.
+backend = None
+
+cache = WordCache(
+    ttl=int(os.getenv("WORD_CACHE_TTL", "300")),
+    max_users=int(os.getenv("WORD_CACHE_MAX_USERS", "5000")),
+    max_rows=int(os.getenv("WORD_CACHE_MAX_ROWS", "200000")),
+    full_sync=int(os.getenv("WORD_CACHE_FULL_SYNC", "3600")),
+)
+
+
+def init(url, key):
+    global backend
+    backend = storage.create_storage(url, key)
+
+
+async def connect():
+    await backend.connect()
+
+
+def _cursor(rows, cursor=None):
+    # updated_at رشته ISO با قالب ثابت backend است، پس مقایسه رشته‌ای همان ترتیب زمانی است
+    return max((w["updated_at"] for w in rows if w.get("updated_at")), default=cursor)
+
+
+async def _sync(user_id):
+    words = cache.get(user_id)
+    if words is not None:
+        return words
+    stale = cache.stale(user_id)
+    if stale is not None:
+        # فقط ردیف‌هایی که از cursor قبلی تغییر کرده‌اند (شامل حذف‌شده‌ها) خوانده می‌شوند
+        _, cursor = stale
+        changed = await backend.get_changed_words(user_id, cursor)
+        words = cache.merge(user_id, changed, _cursor(changed, cursor), cursor)
+        if words is not None:
+            return words
+        # در طول await کش کاربر evict (یا عوض) شده؛ خواندن کامل مثل cache miss
+        words = cache.get(user_id)
+        if words is not None:
+            return words
+    words = await backend.get_words(user_id)
+    cache.set(user_id, words, _cursor(words))
+    return words
+
+
+async def get_words(user_id, category=None):
+    # خواندن کل واژگان همیشه با ستون‌های کش انجام می‌شود تا نتیجه برای دستورهای بعدی هم قابل استفاده باشد
+    words = await _sync(str(user_id))
+    if category:
+        return [w for w in words if w.get("category") == category]
+    return list(words)
+
+
+async def insert_word(user_id, word, meaning, category, max_words=None):
+    # index و سقف کلمه‌ها در خود backend و به‌صورت اتمیک بررسی می‌شوند؛ QuotaExceeded در صورت پر بودن سقف
+    row = await backend.insert_word(str(user_id), word, meaning, category, max_words)
+    if row:
+        cache.add(str(user_id), row)
+    else:
+        cache.expire(str(user_id))
+    return row
+
+
+async def insert_words_bulk(user_id, rows, max_words=None):
+    """همه ردیف‌ها را با یک بازه index پیوسته و در یک تراکنش درج می‌کند (همه یا هیچ)؛ خروجی: اولین index."""
+    user_id = str(user_id)
+    try:
+        return await backend.insert_words_bulk(user_id, rows, max_words)
+    finally:
+        # ردیف‌های جدید در همگام‌سازی تدریجی بعدی خوانده می‌شوند، نه با دانلود دوباره کل واژگان
+        cache.expire(user_id)
+
+
+async def get_words_page(user_id, category=None, after=None, before=None, limit=20, projection="cache"):
+    """یک صفحه از کلمات با keyset pagination روی index؛ خروجی: (words, has_prev, has_next)"""
+    user_id = str(user_id)
+    words = cache.get(user_id)
+    if words is not None:
+        if category:
+            words = [w for w in words if w.get("category") == category]
+        keys = [w["index"] for w in words]
+        if before is not None:
+            end = bisect_left(keys, before)
+            start = max(0, end - limit)
+        else:
+            start = bisect_right(keys, after) if after is not None else 0
+            end = start + limit
+        return words[start:end], start > 0, end < len(words)
+    return await backend.get_words_page(user_id, category, after, before, limit, projection)
+
+
+async def random_words(user_id, count):
+    words = cache.get(str(user_id))
+    if words is not None:
+        sample = random.sample(words, min(count, len(words)))
+        return [{"index": w["index"], "word": w["word"], "meaning": w["meaning"]} for w in sample]
+    return await backend.random_words(str(user_id), count)
+
+
+async def due_words(user_id, count):
+    now = datetime.now(timezone.utc).isoformat()
+    return await backend.due_words(str(user_id), now, count)
+
+
+async def apply_reviews(user_id, reviews):
+    return await backend.apply_reviews(str(user_id), reviews)
+
+
+async def get_word(user_id, index, projection="cache"):
+    words = cache.get(str(user_id))
+    if words is not None:
+        return next((w for w in words if w.get("index") == index), None)
+    return await backend.get_word(str(user_id), index, projection)
+
+
+async def find_word(user_id, word, projection="cache"):
+    words = cache.get(str(user_id))
+    if words is not None:
+        return next((w for w in words if w.get("word") == word), None)
+    return await backend.find_word(str(user_id), word, projection)
+
+
+async def get_words_by_indexes(user_id, indexes, projection="cache"):
+    indexes = set(indexes)
+    words = cache.get(str(user_id))
+    if words is not None:
+        return [w for w in words if w.get("index") in indexes]
+    return await backend.get_words_by_indexes(str(user_id), indexes, projection)
+
+
+async def append_example(user_id, index, example):
+    user_id = str(user_id)
+    count = await backend.append_example(user_id, index, example)
+    words = cache.get(user_id)
+    if count is not None and words is not None:
+        row = next((w for w in words if w.get("index") == index), None)
+        examples = ((row or {}).get("examples") or []) + [example]
+        if row is not None and len(examples) == count:
+            cache.update(user_id, index, {"examples": examples})
+        else:
+            cache.expire(user_id)
+    return count
+
+
+async def load_user_states():
+    return await backend.load_user_states()
+
+
+async def save_user_states(states):
+    await backend.save_user_states(states)
+
+
+async def delete_user_states(user_ids):
+    await backend.delete_user_states(user_ids)
@@ -0,0 +1,76 @@
+import os
+import json
+import asyncio
+import hashlib
+import contextvars
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
+
+import profiling
+
+# ساخت فایل Word در thread جدا انجام می‌شود تا event loop آزاد بماند.
+# تعداد کارهای در صف/در حال اجرا محدود است؛ بقیه منتظر می‌مانند.
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("DOCX_WORKERS", "2")),
+    thread_name_prefix="docx",
+)
+_slots = asyncio.Semaphore(int(os.getenv("DOCX_QUEUE_SIZE", "8")))
+
+# (user_id, filename) -> (digest, file_id): اگر محتوا تغییر نکرده باشد همان فایل قبلی تلگرام دوباره فرستاده می‌شود
+_sent = {}
+
+
+def build_document(title, words, show_category=True):
+    from docx import Document  # import سنگین؛ فقط در اولین خروجی بارگذاری می‌شود
+
+    doc = Document()
+    doc.add_heading(title, 0)
+    for item in words:
+        doc.add_heading(f"{item['index']}. {item['word']}", level=1)
+        doc.add_paragraph(f"🔹 معنی: {item['meaning']}")
+        if show_category:
+            doc.add_paragraph(f"🏷 دسته‌بندی: {item.get('category') or 'بدون دسته‌بندی'}")
+        examples = item.get("examples") or []
+        if examples:
+            doc.add_paragraph("📝 مثال‌ها:")
+            for ex in examples:
+                doc.add_paragraph(f"• {ex}", style='List Bullet')
+
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _build_in_worker(title, words, show_category):
+    with profiling.thread_section():
+        return build_document(title, words, show_category)
+
+
+async def render_docx(title, words, show_category=True):
+    async with _slots:
+        loop = asyncio.get_running_loop()
+        # context کپی می‌شود تا پروفایل update جاری در thread سازنده سند هم در دسترس باشد
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(_executor, ctx.run, _build_in_worker, title, words, show_category)
+
+
+def content_hash(title, words, show_category=True):
+    fields = ("index", "word", "meaning", "category", "examples") if show_category \
+        else ("index", "word", "meaning", "examples")
+    payload = [title] + [[w.get(f) for f in fields] for w in words]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode()).hexdigest()
+
+
+def cached_file_id(user_id, filename, digest):
+    entry = _sent.get((str(user_id), filename))
+    if entry and entry[0] == digest:
+        return entry[1]
+    return None
+
+
+def remember_file_id(user_id, filename, digest, file_id):
+    _sent[(str(user_id), filename)] = (digest, file_id)
+
+
+def forget_file_id(user_id, filename):
+    _sent.pop((str(user_id), filename), None)
@@ -0,0 +1,115 @@
+import io
+import re
+import csv
+
+# خواندن فایل‌های واردکردن واژگان (/import)
+#   CSV/TSV: کلمه، معنی، دسته‌بندی (اختیاری)، مثال‌ها (اختیاری، جداشده با |)
+#   DOCX: همان قالبی که /exportall می‌سازد
+
+HEADER_NAMES = {"word", "wort", "کلمه"}
+EXAMPLE_SEPARATOR = "|"
+_HEADING = re.compile(r"^\s*\d+\.\s*(.+)$")
+_PAIR = re.compile(r"^(.+?)\s*(?:\s[-–—=]\s|\t)\s*(.+)$")
+
+
+class ImportFormatError(Exception):
+    pass
+
+
+def _category(value, categories):
+    value = (value or "").strip().capitalize()
+    return value if value in categories else None
+
+
+def _row(word, meaning, category, examples, categories):
+    word, meaning = (word or "").strip(), (meaning or "").strip()
+    if not word or not meaning:
+        return None
+    return {
+        "word": word,
+        "meaning": meaning,
+        "category": _category(category, categories),
+        "examples": [ex.strip() for ex in examples if ex and ex.strip()],
+    }
+
+
+def iter_csv(data, categories, delimiter=None):
+    text = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", newline="")
+    first = text.readline()
+    if delimiter is None:
+        delimiter = max("\t,;", key=first.count)
+    reader = csv.reader(_chain(first, text), delimiter=delimiter)
+    for n, fields in enumerate(reader):
+        if not fields or (n == 0 and fields[0].strip().lower() in HEADER_NAMES):
+            continue
+        fields += [""] * (4 - len(fields))
+        row = _row(fields[0], fields[1], fields[2], fields[3].split(EXAMPLE_SEPARATOR), categories)
+        if row:
+            yield row
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
+
+
+def iter_docx(data, categories):
+    from docx import Document
+
+    try:
+        doc = Document(io.BytesIO(data))
+    except Exception as e:
+        raise ImportFormatError(f"DOCX قابل خواندن نیست: {e}") from e
+
+    item = None
+    for paragraph in doc.paragraphs:
+        text = paragraph.text.strip()
+        style = paragraph.style.name if paragraph.style is not None else ""
+        heading = _HEADING.match(text) if style.startswith("Heading") else None
+        if heading:
+            if item:
+                row = _row(*item, categories=categories)
+                if row:
+                    yield row
+            item = [heading.group(1), "", "", []]
+        elif item is None:
+            continue
+        elif text.startswith("🔹 معنی:"):
+            item[1] = text.split(":", 1)[1]
+        elif text.startswith("🏷 دسته‌بندی:"):
+            item[2] = text.split(":", 1)[1]
+        elif text.startswith("•"):
+            item[3].append(text[1:])
+    if item:
+        row = _row(*item, categories=categories)
+        if row:
+            yield row
+
+
+def parse_pairs(text):
+    """متن چندخطی «Wort - Bedeutung» را به جفت‌ها تبدیل می‌کند؛ خروجی: (pairs, خطوط نامعتبر)."""
+    pairs, skipped = [], []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        m = _PAIR.match(line)
+        if m and m.group(1).strip() and m.group(2).strip():
+            pairs.append((m.group(1).strip(), m.group(2).strip()))
+        else:
+            skipped.append(line)
+    return pairs, skipped
+
+
+def parse(filename, data, categories):
+    name = filename.lower()
+    try:
+        if name.endswith(".docx"):
+            return list(iter_docx(data, categories))
+        if name.endswith(".tsv"):
+            return list(iter_csv(data, categories, delimiter="\t"))
+        if name.endswith((".csv", ".txt")):
+            return list(iter_csv(data, categories))
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ImportFormatError(f"فایل قابل خواندن نیست: {e}") from e
+    raise ImportFormatError("فقط فایل‌های CSV، TSV یا DOCX پشتیبانی می‌شوند.")
@@ -1,49 +1,62 @@
+import time
+
+_STARTED = time.perf_counter()  # برای گزارش زمان راه‌اندازی بعد از بیدار شدن سرویس
+
 import os
 import re
+import html
+import asyncio
 import random
-import html  # بالای فایل
+import secrets
 from io import BytesIO
+from dotenv import load_dotenv
+
+# قبل از import ماژول‌های خود ربات، چون آن‌ها تنظیماتشان را هنگام import از محیط می‌خوانند
+load_dotenv()
+
 from telegram.helpers import escape
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.constants import ParseMode
+from telegram.error import BadRequest
 from telegram.ext import (
     ApplicationBuilder, CommandHandler, MessageHandler,
     CallbackQueryHandler, ContextTypes, filters
 )
-from supabase import create_client, Client
-from docx import Document
-from dotenv import load_dotenv
-       
-
-
-
-load_dotenv()
+import db
+import access
+import render
+import docx_export
+import srs
+import callbacks
+import importer
+import metrics
+import profiling
+import webserver
+from persistence import create_persistence
+from update_processor import UserLaneUpdateProcessor
+
+startup_times = {"import": time.perf_counter() - _STARTED}
 
 BOT_TOKEN = os.getenv("BOT_TOKEN")
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-OWNER_ID = int(os.getenv("OWNER_ID"))
-
-
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-app = ApplicationBuilder().token(BOT_TOKEN).build()
 
-user_states = {}  # اضافه شد
 quiz_sessions = {}
 
 CATEGORIES = ["Nomen", "Verb", "Adjektiv", "Adverb"]
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.effective_user.id != OWNER_ID:
+    if not access.is_allowed(update.effective_user.id):
         return
     await update.message.reply_text("📄 لطفاً کلمه خود را وارد کنید")
-    user_states[update.effective_user.id] = {"step": "word"}
+    # وضعیت wizard در user_data است تا با persistence بعد از ری‌استارت هم بماند
+    context.user_data["wizard"] = {"step": "word"}
 
 
 async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.effective_user.id != OWNER_ID:
+    if not access.is_allowed(update.effective_user.id):
         return
 
     user_id = update.effective_user.id
@@ -52,170 +65,200 @@ async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if "add_example_word" in context.user_data:
         word_data = context.user_data.pop("add_example_word")
         word_id = word_data["index"]
-        user_id_str = str(user_id)
         new_example = update.message.text.strip()
 
-        result = supabase.from_("words").select("*") \
-            .eq("user_id", user_id_str).eq("index", word_id).execute().data
-        if result:
-            current = result[0]
-            examples = current.get("examples") or []
-            examples.append(new_example)
-
-            supabase.from_("words").update({"examples": examples}) \
-                .eq("user_id", user_id_str).eq("index", word_id).execute()
-
-            await update.message.reply_text("✅ جمله با موفقیت ذخیره شد.")
+        count = await db.append_example(user_id, word_id, new_example)
+        if count:
+            await update.message.reply_text(f"✅ جمله با موفقیت ذخیره شد. (تعداد جمله‌ها: {count})")
+        else:
+            await update.message.reply_text("❌ کلمه‌ای پیدا نشد.")
         return  # مهم! چون نمی‌خوای بقیه کد اجرا شه
 
     # ✅ ادامه کد مربوط به /start:
-    user_id = update.effective_user.id
-    state = user_states.get(user_id)
+    state = context.user_data.get("wizard")
     if not state:
         return
 
     text = update.message.text.strip()
-    if state["step"] == "word":
+    if state["step"] == "word" and "\n" in text:
+        # چند خط «Wort - Bedeutung»: همه با هم و با یک دسته‌بندی ذخیره می‌شوند
+        pairs, skipped = importer.parse_pairs(text)
+        if not pairs:
+            await update.message.reply_text("❗ هر خط باید به شکل «Wort - Bedeutung» باشد.")
+            return
+        state["pairs"] = pairs
+        state["step"] = "category"
+        note = f"\n⚠️ {len(skipped)} خط نامعتبر نادیده گرفته شد." if skipped else ""
+        await update.message.reply_text(
+            f"📋 {len(pairs)} کلمه دریافت شد.{note}\n📂 لطفاً دسته‌بندی همه را انتخاب کن:",
+            reply_markup=category_keyboard()
+        )
+    elif state["step"] == "word":
         state["word"] = text
         state["step"] = "meaning"
         await update.message.reply_text("🧠 حالا معنی کلمه را وارد کنید")
     elif state["step"] == "meaning":
         state["meaning"] = text
         state["step"] = "category"
-        buttons = [[InlineKeyboardButton(cat, callback_data=f"category:{cat}")] for cat in CATEGORIES]
-        await update.message.reply_text("📂 لطفاً دسته‌بندی را انتخاب کن:", reply_markup=InlineKeyboardMarkup(buttons))
+        await update.message.reply_text("📂 لطفاً دسته‌بندی را انتخاب کن:", reply_markup=category_keyboard())
+
 
+def category_keyboard():
+    buttons = [[InlineKeyboardButton(cat, callback_data=callbacks.encode(callbacks.CATEGORY, i))]
+               for i, cat in enumerate(CATEGORIES)]
+    return InlineKeyboardMarkup(buttons)
 
 
-def save_word(user_id, word, meaning, category):
-    result = supabase.from_("words") \
-        .select("index") \
-        .eq("user_id", str(user_id)) \
-        .order("index", desc=True) \
-        .limit(1) \
-        .execute()
-    last_index = result.data[0]["index"] if result.data else 0
-    new_index = last_index + 1
 
-    supabase.from_("words").insert({
-        "word": word,
-        "meaning": meaning,
-        "category": category,
-        "user_id": str(user_id),
-        "index": new_index
-    }).execute()
+async def save_word(user_id, word, meaning, category):
+    return await db.insert_word(user_id, word, meaning, category, access.word_quota(user_id))
+
+
+LIST_PAGE_SIZE = 20
+
+
+async def build_list_page(user_id, category, after=None, before=None):
+    words, has_prev, has_next = await db.get_words_page(
+        user_id, category, after=after, before=before, limit=LIST_PAGE_SIZE, projection="list"
+    )
+    if not words:
+        return None, None
+
+    header = "📚 <b>کلمه‌های ذخیره‌شده:</b>\n\n"
+    blocks = [render.word_block(w) for w in words]
+
+    # هر صفحه باید در یک پیام جا شود؛ از سمت دور از cursor کم می‌کنیم
+    size = len(header) + sum(map(len, blocks))
+    while len(blocks) > 1 and size > render.MESSAGE_LIMIT:
+        size -= len(blocks[0] if before is not None else blocks[-1])
+        if before is not None:
+            blocks.pop(0)
+            words = words[1:]
+            has_prev = True
+        else:
+            blocks.pop()
+            words = words[:-1]
+            has_next = True
+
+    cat = CATEGORIES.index(category) if category else "-"
+    nav = []
+    if has_prev:
+        nav.append(InlineKeyboardButton(
+            "⬅️ قبلی", callback_data=callbacks.encode(callbacks.LIST, cat, "p", words[0]["index"])))
+    if has_next:
+        nav.append(InlineKeyboardButton(
+            "بعدی ➡️", callback_data=callbacks.encode(callbacks.LIST, cat, "n", words[-1]["index"])))
+    markup = InlineKeyboardMarkup([nav]) if nav else None
+    return render.chunk_messages(blocks, header)[0], markup
 
-import html  # مطمئن شو این بالای فایل هست
 
 async def list_words(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.effective_user.id != OWNER_ID:
+    if not access.is_allowed(update.effective_user.id):
         return
 
     try:
-        user_id_str = str(update.effective_user.id)
         args = context.args
+        selected_category = None
 
         if args:
             selected_category = args[0].capitalize()
             if selected_category not in CATEGORIES:
                 await update.message.reply_text("❗ دسته‌بندی معتبر نیست. دسته‌های مجاز: Nomen, Verb, Adjektiv, Adverb")
                 return
-            words = supabase.from_("words").select("*") \
-                .eq("user_id", user_id_str) \
-                .eq("category", selected_category) \
-                .order("index").execute().data
-        else:
-            words = supabase.from_("words").select("*") \
-                .eq("user_id", user_id_str) \
-                .order("index").execute().data
 
-        if not words:
+        text, markup = await build_list_page(update.effective_user.id, selected_category)
+        if not text:
             await update.message.reply_text("⚠️ هیچ کلمه‌ای ذخیره نشده.")
             return
 
-        text = "📚 <b>کلمه‌های ذخیره‌شده:</b>\n\n"
-        messages = []
-        for w in words:
-            index = w.get("index", "-")
-            word = html.escape(w.get("word", "❓"))
-            meaning = html.escape(w.get("meaning", "❓"))
-            category = html.escape(w.get("category", "❓بدون دسته‌بندی"))
-            examples = w.get("examples") or []
+        await update.message.reply_text(text, parse_mode=ParseMode.HTML, reply_markup=markup)
+
+    except Exception as e:
+        print(f"❌ خطای غیرمنتظره در list_words: {e}")
+        await update.message.reply_text("🚫 خطایی در اجرای دستور پیش آمد.")
 
-            block = f"{index}. <b>{word}</b> ➜ {meaning} ({category})\n"
-            for ex in examples:
-                block += f"📝 {html.escape(ex)}\n"
-            block += "\n"
 
-            if len(text + block) > 4000:
-                messages.append(text)
-                text = ""
+async def list_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    if not access.is_allowed(query.from_user.id):
+        return
 
-            text += block
+    cat, direction, cursor = callbacks.decode(query.data)
+    category = None if cat == "-" else CATEGORIES[int(cat)]
+    if direction == "n":
+        text, markup = await build_list_page(query.from_user.id, category, after=int(cursor))
+    else:
+        text, markup = await build_list_page(query.from_user.id, category, before=int(cursor))
 
-        if text:
-            messages.append(text)
+    if text:
+        try:
+            await query.edit_message_text(text, parse_mode=ParseMode.HTML, reply_markup=markup)
+        except BadRequest as e:
+            # دو بار زدن یک دکمه همان صفحه را دوباره می‌سازد
+            if "message is not modified" not in str(e).lower():
+                raise
 
-        for msg in messages:
-            await update.message.reply_text(msg.strip(), parse_mode=ParseMode.HTML)
 
-    except Exception as e:
-        print(f"❌ خطای غیرمنتظره در list_words: {e}")
-        await update.message.reply_text("🚫 خطایی در اجرای دستور پیش آمد.")
+async def send_docx(update: Update, title, words, filename, show_category=True):
+    user_id = update.effective_user.id
+    digest = docx_export.content_hash(title, words, show_category)
+    file_id = docx_export.cached_file_id(user_id, filename, digest)
+    if file_id:
+        try:
+            await update.message.reply_document(document=file_id)
+            return
+        except BadRequest:
+            docx_export.forget_file_id(user_id, filename)
 
+    content = await docx_export.render_docx(title, words, show_category)
+    message = await update.message.reply_document(document=BytesIO(content), filename=filename)
+    docx_export.remember_file_id(user_id, filename, digest, message.document.file_id)
 
-    
 
 async def export_all(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.effective_user.id != OWNER_ID:
+    if not access.is_allowed(update.effective_user.id):
         return
 
-    words = supabase.from_("words").select("*").eq("user_id", str(update.effective_user.id)).order("index").execute().data
+    words = await db.get_words(update.effective_user.id)
     if not words:
         await update.message.reply_text("⚠️ هیچ کلمه‌ای برای خروجی وجود ندارد.")
         return
 
-    doc = Document()
-    doc.add_heading("تمام کلمات ذخیره‌شده", 0)
-    for item in words:
-        doc.add_heading(f"{item['index']}. {item['word']}", level=1)
-        doc.add_paragraph(f"🔹 معنی: {item['meaning']}")
-        doc.add_paragraph(f"🏷 دسته‌بندی: {item.get('category', 'بدون دسته‌بندی')}")
-        examples = item.get("examples") or []
-        if examples:
-            doc.add_paragraph("📝 مثال‌ها:")
-            for ex in examples:
-                doc.add_paragraph(f"• {ex}", style='List Bullet')
-
-    buffer = BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-    await update.message.reply_document(document=buffer, filename="alle_woerter.docx")
+    await send_docx(update, "تمام کلمات ذخیره‌شده", words, "alle_woerter.docx")
 
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
 
     user_id = query.from_user.id
-    state = user_states.get(user_id)
-    if not state or not query.data.startswith("category:"):
+    state = context.user_data.get("wizard")
+    if not state or not access.is_allowed(user_id):
         return
 
-    category = query.data.split(":")[1]
-    word = state["word"]
-    meaning = state["meaning"]
+    category = CATEGORIES[int(callbacks.decode(query.data)[0])]
 
     try:
-        save_word(user_id, word, meaning, category)
-        await query.edit_message_text(f"✅ کلمه '{word}' با موفقیت در دسته‌بندی '{category}' ذخیره شد.")
+        if "pairs" in state:
+            rows = [{"word": w, "meaning": m, "category": category, "examples": []} for w, m in state["pairs"]]
+            first = await db.insert_words_bulk(user_id, rows, access.word_quota(user_id))
+            await query.edit_message_text(
+                f"✅ {len(rows)} کلمه (شماره {first} تا {first + len(rows) - 1}) در دسته‌بندی '{category}' ذخیره شد."
+            )
+        else:
+            word = state["word"]
+            await save_word(user_id, word, state["meaning"], category)
+            await query.edit_message_text(f"✅ کلمه '{word}' با موفقیت در دسته‌بندی '{category}' ذخیره شد.")
+    except db.QuotaExceeded as e:
+        await query.edit_message_text(f"⚠️ به سقف {e.args[0]} کلمه رسیده‌اید.")
     except Exception as e:
         await query.edit_message_text(f"❌ خطا در ذخیره‌سازی:{e}")
 
-    user_states.pop(user_id)
+    context.user_data.pop("wizard", None)
 
 
 async def add_example_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.effective_user.id != OWNER_ID:
+    if not access.is_allowed(update.effective_user.id):
         return
 
     if not context.args:
@@ -223,12 +266,10 @@ async def add_example_command(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
 
     keyword = " ".join(context.args).strip()
-    words = supabase.from_("words").select("*").eq("user_id", str(update.effective_user.id)).execute().data
-    selected = None
     if keyword.isdigit():
-        selected = next((w for w in words if w.get("index") == int(keyword)), None)
+        selected = await db.get_word(update.effective_user.id, int(keyword), "lookup")
     else:
-        selected = next((w for w in words if w.get("word") == keyword), None)
+        selected = await db.find_word(update.effective_user.id, keyword, "lookup")
 
     if not selected:
         await update.message.reply_text("❌ کلمه‌ای پیدا نشد.")
@@ -240,7 +281,7 @@ async def add_example_command(update: Update, context: ContextTypes.DEFAULT_TYPE
 
 
 async def export_words(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.effective_user.id != OWNER_ID:
+    if not access.is_allowed(update.effective_user.id):
         return
 
     if not context.args:
@@ -253,44 +294,22 @@ async def export_words(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("❌ لطفاً فقط شماره‌های معتبر وارد کن.")
         return
 
-    data = supabase.from_("words").select("*").eq("user_id", str(update.effective_user.id)).execute().data
-    filtered = [w for w in data if w.get("index") in indexes]
+    filtered = await db.get_words_by_indexes(update.effective_user.id, indexes, "export") if indexes else []
 
     if not filtered:
         await update.message.reply_text("❌ کلمه‌ای با این شماره‌ها پیدا نشد.")
         return
 
-    text = "📋 <b>کلمه‌های انتخاب‌شده:</b>\n\n"
-    for w in filtered:
-        text += f"{w['index']}. <b>{w['word']}</b> ➜ {w['meaning']}\n"
-        examples = w.get("examples") or []
-        if examples:
-            for ex in examples:
-                text += f"📝 {ex}\n"
-        text += "\n"
-
-    await update.message.reply_text(text.strip(), parse_mode=ParseMode.HTML)
+    blocks = [render.word_block(w, show_category=False) for w in filtered]
+    for msg in render.chunk_messages(blocks, "📋 <b>کلمه‌های انتخاب‌شده:</b>\n\n"):
+        await update.message.reply_text(msg, parse_mode=ParseMode.HTML)
 
     # ساخت فایل Word
-    doc = Document()
-    doc.add_heading("Exportierte Wörter", 0)
-    for item in filtered:
-        doc.add_heading(f"{item['index']}. {item['word']}", level=1)
-        doc.add_paragraph(f"🔹 معنی: {item['meaning']}")
-        examples = item.get("examples") or []
-        if examples:
-            doc.add_paragraph("📝 مثال‌ها:")
-            for ex in examples:
-                doc.add_paragraph(f"• {ex}", style='List Bullet')
-
-    buffer = BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-    await update.message.reply_document(document=buffer, filename="woerter_export.docx")
+    await send_docx(update, "Exportierte Wörter", filtered, "woerter_export.docx", show_category=False)
 
 
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.effective_user.id != OWNER_ID:
+    if not access.is_allowed(update.effective_user.id):
         return
     text = (
         "📌 <b>دستورات موجود:</b>\n\n"
@@ -299,37 +318,131 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "/quiz – آزمون چهارگزینه‌ای\n"
         "/addexample – افزودن جمله\n"
         "/export - خروجی گرفتن\n"
+        "/import - واردکردن کلمات از فایل CSV یا DOCX\n"
         "/showall -نمایش همه کلمات \n"
         "/help – نمایش همین راهنما"
     )
     await update.message.reply_text(text, parse_mode=ParseMode.HTML)
 
+IMPORT_MAX_BYTES = 20 * 1024 * 1024  # محدودیت دانلود فایل در Bot API
+
+
+async def import_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not access.is_allowed(update.effective_user.id):
+        return
+    context.user_data["awaiting_import"] = True
+    await update.message.reply_text(
+        "📥 فایل CSV/TSV (ستون‌ها: کلمه، معنی، دسته‌بندی، مثال‌ها با | جدا) "
+        "یا فایل DOCX خروجی /exportall را بفرستید."
+    )
+
+
+async def document_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not access.is_allowed(update.effective_user.id):
+        return
+    caption = update.message.caption or ""
+    if not context.user_data.pop("awaiting_import", False) and not caption.startswith("/import"):
+        return
+
+    user_id = update.effective_user.id
+    document = update.message.document
+    if document.file_size and document.file_size > IMPORT_MAX_BYTES:
+        await update.message.reply_text("❌ فایل بزرگ‌تر از ۲۰ مگابایت است.")
+        return
+
+    file = await document.get_file()
+    data = bytes(await file.download_as_bytearray())
+    try:
+        rows = await asyncio.to_thread(importer.parse, document.file_name or "", data, CATEGORIES)
+    except importer.ImportFormatError as e:
+        await update.message.reply_text(f"❌ {e}")
+        return
+    if not rows:
+        await update.message.reply_text("⚠️ هیچ کلمه‌ای در فایل پیدا نشد.")
+        return
+
+    try:
+        first = await db.insert_words_bulk(user_id, rows, access.word_quota(user_id))
+    except db.QuotaExceeded as e:
+        await update.message.reply_text(f"⚠️ با این فایل از سقف {e.args[0]} کلمه عبور می‌کنید.")
+        return
+    except Exception as e:
+        print(f"❌ خطا در واردکردن کلمات: {e}")
+        await update.message.reply_text("🚫 خطایی در واردکردن کلمات پیش آمد؛ هیچ کلمه‌ای ذخیره نشد.")
+        return
+
+    await update.message.reply_text(
+        f"✅ {len(rows)} کلمه وارد شد (شماره {first} تا {first + len(rows) - 1})."
+    )
+
+
+async def profiles_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not access.is_owner(update.effective_user.id):
+        return
+    if not profiling.profiles:
+        await update.message.reply_text(
+            "ℹ️ پروفایلی ثبت نشده. PROFILE_SAMPLE_RATE یا PROFILE_SLOW_MS را تنظیم کنید.")
+        return
+
+    blocks = []
+    for p in reversed(profiling.profiles):
+        frames = html.escape("\n".join(p["frames"]))
+        blocks.append(f"<b>{p['handler']}</b> – {p['ms']}ms – {p['at']}\n<pre>{frames}</pre>\n\n")
+    for msg in render.chunk_messages(blocks):
+        await update.message.reply_text(msg, parse_mode=ParseMode.HTML)
+
+QUIZ_SIZE = 10
+
+
 async def quiz(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.effective_user.id != OWNER_ID:
+    if not access.is_allowed(update.effective_user.id):
+        return
+    user_id = update.effective_user.id
+    due = await db.due_words(user_id, QUIZ_SIZE)
+    if not due:
+        await update.message.reply_text("🎉 فعلاً کلمه‌ای برای مرور نمانده.")
         return
-    data = supabase.from_("words").select("*").eq("user_id", str(update.effective_user.id)).execute().data
-    if len(data) < 4:
+
+    # گزینه‌های غلط از بین کلمه‌های سررسید و چند کلمه تصادفی انتخاب می‌شوند
+    pool = [{"index": w["index"], "word": w["word"], "meaning": w["meaning"]} for w in due]
+    if len(pool) < 4:
+        seen = {w["index"] for w in pool}
+        pool += [w for w in await db.random_words(user_id, QUIZ_SIZE) if w["index"] not in seen]
+    if len(pool) < 4:
         await update.message.reply_text("⚠️ حداقل ۴ کلمه لازم است.")
         return
 
     session = {
-        "items": random.sample(data, min(10, len(data))),
-        "current": 0,
-        "score": 0
+        "id": secrets.token_hex(3),
+        "items": due,
+        "pool": pool,
+        "queue": srs.new_queue(due),
+        "current": None,
+        "asked": 0,
+        "score": 0,
+        "results": {},
     }
     context.user_data["quiz"] = session
     await ask_question(update, context)
 
 async def ask_question(update: Update, context: ContextTypes.DEFAULT_TYPE):
     session = context.user_data["quiz"]
+    session["current"] = srs.next_card(session["queue"])
+    session["asked"] += 1
     item = session["items"][session["current"]]
-    options = random.sample(session["items"], 3)
+    others = [o for o in session["pool"] if o["index"] != item["index"]]
+    options = random.sample(others, 3)
     options.append(item)
     random.shuffle(options)
 
-    buttons = [[InlineKeyboardButton(o["meaning"], callback_data=o["word"])] for o in options]
+    session["answer"] = options.index(item)
+    buttons = [
+        [InlineKeyboardButton(o["meaning"], callback_data=callbacks.encode(
+            callbacks.QUIZ, session["id"], session["asked"], i))]
+        for i, o in enumerate(options)
+    ]
     await update.message.reply_text(
-        f"❓ سوال {session['current'] + 1} از {len(session['items'])}: <b>{item['word']}</b> یعنی چی؟",
+        f"❓ سوال {session['asked']} (باقی‌مانده: {len(session['queue'])}): <b>{item['word']}</b> یعنی چی؟",
         parse_mode=ParseMode.HTML,
         reply_markup=InlineKeyboardMarkup(buttons)
     )
@@ -338,79 +451,102 @@ async def answer_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     session = context.user_data.get("quiz")
-    if not session:
+    if not session or not access.is_allowed(query.from_user.id):
         return
+    session_id, asked, option = callbacks.decode(query.data)
+    if session_id != session.get("id") or int(asked) != session["asked"]:
+        return  # دکمه‌های یک سوال یا آزمون قدیمی
     current_item = session["items"][session["current"]]
-    if query.data == current_item["word"]:
-        session["score"] += 1
+    correct = int(option) == session["answer"]
+    if correct:
         await query.edit_message_text("✅ آفرین درست گفتی")
     else:
         await query.edit_message_text(f"❌ جواب اشتباه بود. معنی درست: {current_item['meaning']}")
 
-    session["current"] += 1
-    if session["current"] < len(session["items"]):
+    # فقط اولین جواب هر کلمه در زمان‌بندی حساب می‌شود؛ جواب غلط یک بار دیگر در همین جلسه پرسیده می‌شود
+    key = str(current_item["index"])
+    if key not in session["results"]:
+        session["results"][key] = srs.schedule(current_item, correct)
+        if correct:
+            session["score"] += 1
+        else:
+            srs.requeue(session["queue"], session["current"])
+
+    if session["queue"]:
         await ask_question(query, context)
     else:
+        context.user_data.pop("quiz", None)
+        try:
+            await db.apply_reviews(query.from_user.id, list(session["results"].values()))
+        except Exception as e:
+            print(f"❌ خطا در ذخیره نتیجه مرور: {e}")
         await context.bot.send_message(
             chat_id=query.from_user.id,
             text=f"🏁 آزمون تمام شد. امتیاز: {session['score']} از {len(session['items'])}"
         )
 async def show_all_words(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    if update.effective_user.id != OWNER_ID:
+    if not access.is_allowed(update.effective_user.id):
         return
 
-    words = supabase.from_("words").select("*") \
-        .eq("user_id", str(update.effective_user.id)) \
-        .order("index").execute().data
+    words = await db.get_words(update.effective_user.id)
 
     if not words:
         await update.message.reply_text("⚠️ هیچ کلمه‌ای ذخیره نشده.")
         return
 
-    MAX_MESSAGE_LENGTH = 4000  # محدودیت تلگرام
-    message_parts = []
-    current_text = ""
+    blocks = [render.word_block(w, show_category=False) for w in words]
+    for part in render.chunk_messages(blocks):
+        await update.message.reply_text(part, parse_mode=ParseMode.HTML)
 
-    for w in words:
-        index = w.get("index", "❓")
-        word = html.escape(w.get("word", "❓"))
-        meaning = html.escape(w.get("meaning", "❓"))
-        examples = w.get("examples") or []
 
-        block = f"{index}. <b>{word}</b> ➜ {meaning}\n"
-        for ex in examples:
-            block += f"📝 {html.escape(ex)}\n"
-        block += "\n"
+async def post_init(application):
+    startup_times["initialize"] = time.perf_counter() - _STARTED - sum(startup_times.values())
+    # کلاینت Supabase در پس‌زمینه ساخته می‌شود تا webhook بدون معطلی شروع به کار کند
+    application.create_task(db.connect())
+    report = ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in startup_times.items())
+    print(f"⏱ زمان راه‌اندازی: {report}")
 
-        if len(current_text) + len(block) > MAX_MESSAGE_LENGTH:
-            message_parts.append(current_text)
-            current_text = block
-        else:
-            current_text += block
 
-    if current_text:
-        message_parts.append(current_text)
+def build_app():
+    started = time.perf_counter()
+    db.init(SUPABASE_URL, SUPABASE_KEY)
 
-    for part in message_parts:
-        await update.message.reply_text(part.strip(), parse_mode=ParseMode.HTML)
+    app = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .request(metrics.MetricsRequest(connection_pool_size=256))
+        .updater(None)
+        .concurrent_updates(UserLaneUpdateProcessor(int(os.getenv("MAX_CONCURRENT_UPDATES", "64"))))
+        .persistence(create_persistence())
+        .post_init(post_init)
+        .build()
+    )
 
+    app.add_handler(CommandHandler("start", start))
+    app.add_handler(CommandHandler("list", list_words))
+    app.add_handler(CommandHandler("quiz", quiz))
+    app.add_handler(CommandHandler("export", export_words))
+    app.add_handler(CommandHandler("exportall", export_all))
+    app.add_handler(CommandHandler("addexample", add_example_command))
+    app.add_handler(CommandHandler("help", help_command))
+    app.add_handler(CommandHandler("showall", show_all_words))
+    app.add_handler(CommandHandler("profiles", profiles_command))
+    app.add_handler(CommandHandler("import", import_command))
 
-app.add_handler(CommandHandler("start", start))
-app.add_handler(CommandHandler("list", list_words))
-app.add_handler(CommandHandler("quiz", quiz))
-app.add_handler(CommandHandler("export", export_words))
-app.add_handler(CommandHandler("exportall", export_all))
-app.add_handler(CommandHandler("addexample", add_example_command))
-app.add_handler(CommandHandler("help", help_command))
-app.add_handler(CommandHandler("showall", show_all_words))
+    app.add_handler(CallbackQueryHandler(button_handler, pattern=callbacks.pattern(callbacks.CATEGORY)))
+    app.add_handler(CallbackQueryHandler(list_page_callback, pattern=callbacks.pattern(callbacks.LIST)))
+    app.add_handler(CallbackQueryHandler(answer_callback, pattern=callbacks.pattern(callbacks.QUIZ)))
 
-app.add_handler(CallbackQueryHandler(button_handler, pattern="^category:.*$"))
-app.add_handler(CallbackQueryHandler(answer_callback))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, message_handler))
+    app.add_handler(MessageHandler(filters.Document.ALL, document_handler))
 
-app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, message_handler))
+    for handlers in app.handlers.values():
+        for handler in handlers:
+            handler.callback = metrics.instrument(profiling.instrument(handler.callback))
 
+    startup_times["build"] = time.perf_counter() - started
+    return app
 
-import asyncio
 
 PORT = int(os.environ.get("PORT", "8080"))
 RENDER_HOST = os.environ.get("RENDER_EXTERNAL_HOSTNAME")
@@ -418,10 +554,11 @@ WEBHOOK_PATH = f"/{BOT_TOKEN}"
 WEBHOOK_URL = f"https://{RENDER_HOST}/{BOT_TOKEN}"
 
 if __name__ == "__main__":
-    asyncio.run(app.run_webhook(
+    # webhook تلگرام و /metrics روی یک پورت (webserver.py)
+    asyncio.run(webserver.serve(
+        build_app(),
         listen="0.0.0.0",
         port=PORT,
-        url_path=WEBHOOK_PATH,
+        webhook_path=WEBHOOK_PATH,
         webhook_url=WEBHOOK_URL
     ))
-
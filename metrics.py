@@ -0,0 +1,125 @@
+import time
+import functools
+import contextvars
+from telegram.request import HTTPXRequest
+
+# متریک‌های ساده به فرمت متنی Prometheus؛ در مسیر /metrics سرور webhook سرو می‌شوند.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ROUND_TRIP_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50)
+
+HELP = {
+    "bot_handler_seconds": ("histogram", "Handler latency per registered callback."),
+    "bot_handler_errors_total": ("counter", "Handler calls that raised."),
+    "bot_update_round_trips": ("histogram", "Supabase/Telegram round trips made while handling one update."),
+    "bot_supabase_request_seconds": ("histogram", "Supabase (PostgREST) request latency."),
+    "bot_supabase_errors_total": ("counter", "Supabase requests that raised."),
+    "bot_telegram_request_seconds": ("histogram", "Telegram Bot API request latency."),
+    "bot_telegram_errors_total": ("counter", "Telegram Bot API requests that failed."),
+}
+
+_histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+_bucket_bounds = {}
+_counters = {}  # (name, labels) -> value
+
+# شمارنده رفت‌وبرگشت‌های update جاری (در هر هندلر مقداردهی می‌شود)
+_round_trips = contextvars.ContextVar("round_trips", default=None)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    key = _key(name, labels)
+    entry = _histograms.get(key)
+    if entry is None:
+        _bucket_bounds[name] = buckets
+        entry = _histograms[key] = [0] * len(buckets) + [0.0, 0]
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            entry[i] += 1
+    entry[-2] += value
+    entry[-1] += 1
+
+
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    _counters[key] = _counters.get(key, 0) + value
+
+
+def count_round_trip(target):
+    counts = _round_trips.get()
+    if counts is not None:
+        counts[target] = counts.get(target, 0) + 1
+
+
+def _labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+def render():
+    lines = []
+    names = sorted({k[0] for k in _histograms} | {k[0] for k in _counters})
+    for name in names:
+        kind, text = HELP.get(name, ("untyped", name))
+        lines.append(f"# HELP {name} {text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for (metric, labels), entry in sorted(_histograms.items()):
+            if metric != name:
+                continue
+            for bound, count in zip(_bucket_bounds[name], entry):
+                lines.append(f"{name}_bucket{_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{_labels(labels, [('le', '+Inf')])} {entry[-1]}")
+            lines.append(f"{name}_sum{_labels(labels)} {entry[-2]}")
+            lines.append(f"{name}_count{_labels(labels)} {entry[-1]}")
+        for (metric, labels), value in sorted(_counters.items()):
+            if metric == name:
+                lines.append(f"{name}{_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def instrument(callback):
+    """هندلر را با زمان‌سنجی، شمارش خطا و شمارش رفت‌وبرگشت‌های همان update می‌پوشاند."""
+    handler = callback.__name__
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        counts = {}
+        token = _round_trips.set(counts)
+        started = time.perf_counter()
+        try:
+            return await callback(update, context)
+        except Exception:
+            inc("bot_handler_errors_total", handler=handler)
+            raise
+        finally:
+            observe("bot_handler_seconds", time.perf_counter() - started, handler=handler)
+            for target in ("supabase", "telegram"):
+                observe("bot_update_round_trips", counts.get(target, 0), ROUND_TRIP_BUCKETS,
+                        handler=handler, target=target)
+            _round_trips.reset(token)
+
+    return wrapper
+
+
+class MetricsRequest(HTTPXRequest):
+    """HTTPXRequest که زمان و خطای هر فراخوانی Bot API را ثبت می‌کند."""
+
+    async def do_request(self, url, method, *args, **kwargs):
+        endpoint = url.rsplit("/", 1)[-1]
+        started = time.perf_counter()
+        count_round_trip("telegram")
+        try:
+            code, payload = await super().do_request(url, method, *args, **kwargs)
+        except Exception:
+            inc("bot_telegram_errors_total", method=endpoint)
+            raise
+        finally:
+            observe("bot_telegram_request_seconds", time.perf_counter() - started, method=endpoint)
+        if code >= 400:
+            inc("bot_telegram_errors_total", method=endpoint)
+        return code, payload
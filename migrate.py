@@ -0,0 +1,75 @@
+import os
+import sys
+import hashlib
+from pathlib import Path
+from dotenv import load_dotenv
+
+# اجرای migrationهای پوشه migrations به ترتیب شماره، هر کدام یک بار و در تراکنش خودش
+#   python migrate.py            اجرای migrationهای اجرانشده
+#   python migrate.py --status   فقط نمایش وضعیت
+# DATABASE_URL همان connection string پروژه Supabase است (Settings → Database).
+# به psycopg نیاز دارد که فقط برای همین اسکریپت لازم است: pip install "psycopg[binary]"
+# همه فایل‌ها idempotent نوشته شده‌اند، پس اجرای اول روی پروژه‌ای که قبلاً دستی migrate شده بی‌خطر است.
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / "migrations"
+# قفل سراسری تا دو اجرای همزمان (مثلاً دو deploy) روی هم نیفتند
+LOCK_ID = 7_301_2024
+
+
+def migration_files():
+    return sorted(MIGRATIONS_DIR.glob("[0-9][0-9][0-9][0-9]_*.sql"))
+
+
+def _checksum(sql):
+    return hashlib.sha256(sql.encode()).hexdigest()[:16]
+
+
+def _connect(url):
+    try:
+        import psycopg
+    except ImportError:
+        sys.exit('psycopg نصب نیست: pip install "psycopg[binary]"')
+    return psycopg.connect(url, autocommit=True)
+
+
+def _applied(conn):
+    conn.execute(
+        "create table if not exists schema_migrations ("
+        " version text primary key,"
+        " checksum text not null,"
+        " applied_at timestamptz not null default now())"
+    )
+    return dict(conn.execute("select version, checksum from schema_migrations").fetchall())
+
+
+def migrate(url, status_only=False):
+    with _connect(url) as conn:
+        conn.execute("select pg_advisory_lock(%s)", (LOCK_ID,))
+        try:
+            applied = _applied(conn)
+            for path in migration_files():
+                version, sql = path.stem, path.read_text(encoding="utf-8")
+                if version in applied:
+                    changed = applied[version] != _checksum(sql)
+                    print(f"  {version}  {'⚠️ بعد از اجرا تغییر کرده' if changed else '✓'}")
+                    continue
+                if status_only:
+                    print(f"  {version}  (اجرا نشده)")
+                    continue
+                print(f"→ {version}")
+                with conn.transaction():
+                    conn.execute(sql)
+                    conn.execute(
+                        "insert into schema_migrations (version, checksum) values (%s, %s)",
+                        (version, _checksum(sql)),
+                    )
+        finally:
+            conn.execute("select pg_advisory_unlock(%s)", (LOCK_ID,))
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    database_url = os.getenv("DATABASE_URL")
+    if not database_url:
+        sys.exit("DATABASE_URL تنظیم نشده است.")
+    migrate(database_url, status_only="--status" in sys.argv[1:])
@@ -0,0 +1,14 @@
+-- جدول اصلی واژگان؛ روی پروژه‌های قدیمی که جدول را دستی ساخته‌اند کاری انجام نمی‌دهد
+-- ستون‌های مرور (SM-2) در 0005 و ایندکس‌های کوئری‌ها در 0008 اضافه می‌شوند.
+
+create table if not exists words (
+    id bigint generated by default as identity primary key,
+    user_id text not null,
+    "index" integer not null,
+    word text not null,
+    meaning text not null,
+    category text,
+    examples text[] not null default '{}',
+    created_at timestamptz not null default now(),
+    constraint words_user_id_index_key unique (user_id, "index")
+);
@@ -0,0 +1,47 @@
+-- تخصیص اتمیک index برای هر کاربر در سمت دیتابیس
+-- save_word با یک RPC (insert_word) کلمه را درج می‌کند و ردیف جدید را برمی‌گرداند.
+
+create table if not exists word_counters (
+    user_id text primary key,
+    last_index integer not null default 0
+);
+
+-- مقداردهی اولیه شمارنده‌ها از روی داده‌های موجود
+insert into word_counters (user_id, last_index)
+select user_id, max("index") from words group by user_id
+on conflict (user_id) do update
+    set last_index = greatest(word_counters.last_index, excluded.last_index);
+
+do $$
+begin
+    if not exists (
+        select 1 from pg_constraint where conname = 'words_user_id_index_key'
+    ) then
+        alter table words add constraint words_user_id_index_key unique (user_id, "index");
+    end if;
+end;
+$$;
+
+create or replace function insert_word(
+    p_user_id text,
+    p_word text,
+    p_meaning text,
+    p_category text
+)
+returns setof words
+language plpgsql
+as $$
+declare
+    v_index integer;
+begin
+    -- قفل سطری روی شمارنده کاربر، ذخیره‌های همزمان را سریالی می‌کند
+    insert into word_counters (user_id, last_index) values (p_user_id, 1)
+    on conflict (user_id) do update set last_index = word_counters.last_index + 1
+    returning last_index into v_index;
+
+    return query
+    insert into words (user_id, word, meaning, category, "index")
+    values (p_user_id, p_word, p_meaning, p_category, v_index)
+    returning *;
+end;
+$$;
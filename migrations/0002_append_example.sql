@@ -0,0 +1,16 @@
+-- افزودن اتمیک جمله مثال: یک رفت‌وبرگشت، بدون lost update
+-- خروجی: تعداد جمله‌های کلمه بعد از افزودن (یا null اگر کلمه پیدا نشد)
+
+create or replace function append_example(
+    p_user_id text,
+    p_index integer,
+    p_example text
+)
+returns integer
+language sql
+as $$
+    update words
+    set examples = array_append(coalesce(examples, '{}'), p_example)
+    where user_id = p_user_id and "index" = p_index
+    returning coalesce(array_length(examples, 1), 0);
+$$;
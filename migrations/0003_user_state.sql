@@ -0,0 +1,7 @@
+-- وضعیت کاربران (wizard افزودن کلمه، آزمون، افزودن جمله) تا بعد از sleep یا redeploy از بین نرود
+
+create table if not exists bot_user_state (
+    user_id text primary key,
+    data jsonb not null default '{}'::jsonb,
+    updated_at timestamptz not null default now()
+);
@@ -0,0 +1,14 @@
+-- نمونه تصادفی N کلمه برای /quiz، مستقیماً در Postgres
+-- فقط ستون‌های لازم برای آزمون برگردانده می‌شوند.
+
+create or replace function random_words(p_user_id text, p_count integer)
+returns table ("index" integer, word text, meaning text)
+language sql
+stable
+as $$
+    select w."index", w.word, w.meaning
+    from words w
+    where w.user_id = p_user_id
+    order by random()
+    limit p_count;
+$$;
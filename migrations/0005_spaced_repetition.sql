@@ -0,0 +1,27 @@
+-- زمان‌بندی مرور (SM-2) برای هر کلمه و صف سررسیدها
+
+alter table words add column if not exists due_at timestamptz not null default now();
+alter table words add column if not exists ease real not null default 2.5;
+alter table words add column if not exists interval_days real not null default 0;
+alter table words add column if not exists reps integer not null default 0;
+
+create index if not exists words_user_id_due_at_idx on words (user_id, due_at);
+
+-- نتیجه کل یک جلسه مرور در یک درخواست ذخیره می‌شود
+-- p_reviews: [{"index": 3, "ease": 2.6, "interval_days": 6, "reps": 2, "due_at": "..."}, ...]
+create or replace function apply_reviews(p_user_id text, p_reviews jsonb)
+returns integer
+language sql
+as $$
+    with updated as (
+        update words w
+        set due_at = (r->>'due_at')::timestamptz,
+            ease = (r->>'ease')::real,
+            interval_days = (r->>'interval_days')::real,
+            reps = (r->>'reps')::integer
+        from jsonb_array_elements(p_reviews) r
+        where w.user_id = p_user_id and w."index" = (r->>'index')::integer
+        returning 1
+    )
+    select count(*)::integer from updated;
+$$;
@@ -0,0 +1,34 @@
+-- سقف تعداد کلمه برای هر کاربر در حالت چندکاربره (MAX_WORDS_PER_USER)
+-- insert_word یک پارامتر اختیاری p_max_words می‌گیرد؛ null یعنی بدون سقف.
+
+drop function if exists insert_word(text, text, text, text);
+
+create or replace function insert_word(
+    p_user_id text,
+    p_word text,
+    p_meaning text,
+    p_category text,
+    p_max_words integer default null
+)
+returns setof words
+language plpgsql
+as $$
+declare
+    v_index integer;
+begin
+    -- قفل سطری روی شمارنده کاربر، ذخیره‌های همزمان را سریالی می‌کند
+    insert into word_counters (user_id, last_index) values (p_user_id, 1)
+    on conflict (user_id) do update set last_index = word_counters.last_index + 1
+    returning last_index into v_index;
+
+    if p_max_words is not null
+       and (select count(*) from words where user_id = p_user_id) >= p_max_words then
+        raise exception 'word_quota_exceeded';
+    end if;
+
+    return query
+    insert into words (user_id, word, meaning, category, "index")
+    values (p_user_id, p_word, p_meaning, p_category, v_index)
+    returning *;
+end;
+$$;
@@ -0,0 +1,26 @@
+-- رزرو یک بازه پیوسته از index برای واردکردن گروهی (/import و ورود چندخطی)
+-- خروجی: اولین index بازه؛ ردیف‌ها سپس در دسته‌های چندصدتایی درج می‌شوند.
+
+create or replace function reserve_indexes(
+    p_user_id text,
+    p_count integer,
+    p_max_words integer default null
+)
+returns integer
+language plpgsql
+as $$
+declare
+    v_last integer;
+begin
+    insert into word_counters (user_id, last_index) values (p_user_id, p_count)
+    on conflict (user_id) do update set last_index = word_counters.last_index + p_count
+    returning last_index into v_last;
+
+    if p_max_words is not null
+       and (select count(*) from words where user_id = p_user_id) + p_count > p_max_words then
+        raise exception 'word_quota_exceeded';
+    end if;
+
+    return v_last - p_count + 1;
+end;
+$$;
@@ -0,0 +1,10 @@
+-- ایندکس‌های مرکب برای کوئری‌های ربات تا هیچ‌کدام روی words اسکن ترتیبی نشوند
+--   (user_id, index)            : get_words، صفحه‌بندی /list، get_word، /export  ← همان unique constraint در 0000/0001
+--   (user_id, category, index)  : صفحه‌بندی /list با فیلتر دسته‌بندی
+--   (user_id, word)             : /addexample با نام کلمه (find_word)
+--   (user_id, due_at)           : صف مرور /quiz ← در 0005
+
+create index if not exists words_user_id_category_index_idx on words (user_id, category, "index");
+create index if not exists words_user_id_word_idx on words (user_id, word);
+
+analyze words;
@@ -0,0 +1,91 @@
+-- همگام‌سازی تدریجی کش ربات: updated_at با trigger و حذف نرم با deleted_at
+-- ربات بعد از TTL فقط ردیف‌های با updated_at >= آخرین cursor را می‌خواند (ایندکس (user_id, updated_at)).
+-- clock_timestamp به‌جای now تا ردیف‌های یک تراکنش طولانی زمان واقعی تغییر را بگیرند.
+
+alter table words add column if not exists updated_at timestamptz not null default clock_timestamp();
+alter table words add column if not exists deleted_at timestamptz;
+
+create index if not exists words_user_id_updated_at_idx on words (user_id, updated_at);
+
+create or replace function words_touch_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at = clock_timestamp();
+    return new;
+end;
+$$;
+
+drop trigger if exists words_touch_updated_at on words;
+create trigger words_touch_updated_at
+    before update on words
+    for each row execute function words_touch_updated_at();
+
+-- کلمه‌های حذف‌شده (deleted_at not null) در آزمون و سقف کلمه‌ها حساب نمی‌شوند
+
+create or replace function random_words(p_user_id text, p_count integer)
+returns table ("index" integer, word text, meaning text)
+language sql
+stable
+as $$
+    select w."index", w.word, w.meaning
+    from words w
+    where w.user_id = p_user_id and w.deleted_at is null
+    order by random()
+    limit p_count;
+$$;
+
+create or replace function insert_word(
+    p_user_id text,
+    p_word text,
+    p_meaning text,
+    p_category text,
+    p_max_words integer default null
+)
+returns setof words
+language plpgsql
+as $$
+declare
+    v_index integer;
+begin
+    -- قفل سطری روی شمارنده کاربر، ذخیره‌های همزمان را سریالی می‌کند
+    insert into word_counters (user_id, last_index) values (p_user_id, 1)
+    on conflict (user_id) do update set last_index = word_counters.last_index + 1
+    returning last_index into v_index;
+
+    if p_max_words is not null
+       and (select count(*) from words where user_id = p_user_id and deleted_at is null) >= p_max_words then
+        raise exception 'word_quota_exceeded';
+    end if;
+
+    return query
+    insert into words (user_id, word, meaning, category, "index")
+    values (p_user_id, p_word, p_meaning, p_category, v_index)
+    returning *;
+end;
+$$;
+
+create or replace function reserve_indexes(
+    p_user_id text,
+    p_count integer,
+    p_max_words integer default null
+)
+returns integer
+language plpgsql
+as $$
+declare
+    v_last integer;
+begin
+    insert into word_counters (user_id, last_index) values (p_user_id, p_count)
+    on conflict (user_id) do update set last_index = word_counters.last_index + p_count
+    returning last_index into v_last;
+
+    if p_max_words is not null
+       and (select count(*) from words where user_id = p_user_id and deleted_at is null) + p_count > p_max_words then
+        raise exception 'word_quota_exceeded';
+    end if;
+
+    return v_last - p_count + 1;
+end;
+$$;
@@ -0,0 +1,34 @@
+-- واردکردن گروهی همه‌یا‌هیچ (/import و ورود چندخطی): رزرو بازه index و درج همه ردیف‌ها در یک تراکنش
+-- p_rows: [{"word": "...", "meaning": "...", "category": "Nomen" | null, "examples": ["..."]}, ...]
+-- خروجی: اولین index بازه. اگر درج شکست بخورد شمارنده هم برمی‌گردد و هیچ ردیفی نمی‌ماند.
+
+create or replace function insert_words(
+    p_user_id text,
+    p_rows jsonb,
+    p_max_words integer default null
+)
+returns integer
+language plpgsql
+as $$
+declare
+    v_first integer;
+begin
+    v_first := reserve_indexes(p_user_id, jsonb_array_length(p_rows), p_max_words);
+
+    insert into words (user_id, "index", word, meaning, category, examples)
+    select
+        p_user_id,
+        v_first + r.ord - 1,
+        r.value->>'word',
+        r.value->>'meaning',
+        r.value->>'category',
+        array(
+            select jsonb_array_elements_text(
+                case when jsonb_typeof(r.value->'examples') = 'array' then r.value->'examples' else '[]' end
+            )
+        )
+    from jsonb_array_elements(p_rows) with ordinality as r(value, ord);
+
+    return v_first;
+end;
+$$;
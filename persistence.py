@@ -0,0 +1,157 @@
+import os
+import json
+import asyncio
+import sqlite3
+from telegram.ext import BasePersistence, PersistenceInput
+
+import db
+
+
+class SQLiteStateStore:
+    """ذخیره user_data در یک فایل SQLite محلی."""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS user_state (user_id INTEGER PRIMARY KEY, data TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _load(self):
+        rows = self._conn.execute("SELECT user_id, data FROM user_state").fetchall()
+        return {user_id: json.loads(data) for user_id, data in rows}
+
+    def _save(self, states, deleted):
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO user_state (user_id, data) VALUES (?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data",
+                [(user_id, json.dumps(data, ensure_ascii=False)) for user_id, data in states.items()],
+            )
+            self._conn.executemany(
+                "DELETE FROM user_state WHERE user_id = ?", [(user_id,) for user_id in deleted]
+            )
+
+    async def load(self):
+        return await asyncio.to_thread(self._load)
+
+    async def save(self, states, deleted):
+        await asyncio.to_thread(self._save, states, deleted)
+
+
+class StorageStateStore:
+    """ذخیره user_data در جدول bot_user_state همان backend کلمات (Supabase: migrations/0003_user_state.sql)."""
+
+    async def load(self):
+        return await db.load_user_states()
+
+    async def save(self, states, deleted):
+        if states:
+            await db.save_user_states(states)
+        if deleted:
+            await db.delete_user_states(deleted)
+
+
+class StatePersistence(BasePersistence):
+    """فقط user_data (حالت wizard، آزمون و افزودن جمله) را نگه می‌دارد.
+
+    Application هر update_interval ثانیه کاربرانِ تغییرکرده را می‌فرستد؛ اینجا همه آن‌ها
+    جمع می‌شوند و در یک نوشتن گروهی ذخیره می‌شوند، نه یک رفت‌وبرگشت برای هر پیام.
+    """
+
+    def __init__(self, store, update_interval=30):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.store = store
+        self._pending = {}
+        self._deleted = set()
+        self._flush_task = None
+
+    def _schedule_flush(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_soon())
+
+    async def _flush_soon(self):
+        # اجازه می‌دهیم بقیه update_user_dataهای همین دور هم جمع شوند
+        await asyncio.sleep(0.1)
+        await self.flush()
+
+    async def flush(self):
+        task = self._flush_task
+        if task is not None and task is not asyncio.current_task() and not task.done():
+            await task
+        states, deleted = self._pending, self._deleted
+        self._pending, self._deleted = {}, set()
+        if not states and not deleted:
+            return
+        try:
+            await self.store.save(states, deleted)
+        except Exception as e:
+            print(f"❌ خطا در ذخیره وضعیت کاربران: {e}")
+            # دفعه بعد دوباره تلاش می‌شود، مگر اینکه داده جدیدتری رسیده باشد
+            for user_id, data in states.items():
+                self._pending.setdefault(user_id, data)
+            self._deleted |= deleted - self._pending.keys()
+
+    async def get_user_data(self):
+        return await self.store.load()
+
+    async def update_user_data(self, user_id, data):
+        self._deleted.discard(user_id)
+        self._pending[user_id] = data
+        self._schedule_flush()
+
+    async def drop_user_data(self, user_id):
+        self._pending.pop(user_id, None)
+        self._deleted.add(user_id)
+        self._schedule_flush()
+
+    async def refresh_user_data(self, user_id, user_data):
+        pass
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name):
+        return {}
+
+    async def update_conversation(self, name, key, new_state):
+        pass
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+
+def create_persistence():
+    # روی Render (متغیر RENDER) پیش‌فرض backend کلمات (db.backend) است، در اجرای محلی یک فایل SQLite جدا
+    # مقدار قدیمی "supabase" هم به معنی "storage" پذیرفته می‌شود
+    backend = os.getenv("STATE_BACKEND") or ("storage" if os.getenv("RENDER") else "sqlite")
+    if backend in ("storage", "supabase"):
+        store = StorageStateStore()
+    else:
+        store = SQLiteStateStore(os.getenv("STATE_DB_PATH", "bot_state.sqlite3"))
+    return StatePersistence(store, update_interval=float(os.getenv("STATE_FLUSH_INTERVAL", "30")))
@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+import pstats
+import cProfile
+import functools
+import itertools
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# پروفایل نمونه‌ای updateها با cProfile (پیش‌فرض خاموش)
+#   PROFILE_SAMPLE_RATE=N  هر N update یکی پروفایل می‌شود
+#   PROFILE_SLOW_MS=T      همه updateها پروفایل می‌شوند ولی فقط آن‌هایی که بیشتر از T میلی‌ثانیه طول کشیدند نگه داشته می‌شوند
+# چون همه هندلرها روی یک event loop اجرا می‌شوند، کارهای همزمانِ updateهای دیگر هم ممکن است در پروفایل دیده شوند.
+SAMPLE_RATE = int(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+TOP_FRAMES = int(os.getenv("PROFILE_TOP_FRAMES", "15"))
+
+profiles = deque(maxlen=int(os.getenv("PROFILE_KEEP", "20")))
+
+_counter = itertools.count(1)
+_active = False
+# پروفایل‌های threadهای کمکی (مثل ساخت DOCX) که باید به پروفایل update جاری اضافه شوند
+_thread_profiles = contextvars.ContextVar("thread_profiles", default=None)
+# از Python 3.12 cProfile روی sys.monitoring سراسری ساخته شده: پروفایل update کار threadهای دیگر را هم می‌بیند
+# و فعال کردن پروفایلر دوم در thread کمکی ValueError می‌دهد.
+_PER_THREAD_PROFILES = sys.version_info < (3, 12)
+
+
+def _should_profile():
+    if SLOW_MS > 0:
+        return True
+    return SAMPLE_RATE > 0 and next(_counter) % SAMPLE_RATE == 0
+
+
+def _top_frames(profile, extra):
+    try:
+        stats = pstats.Stats(profile)
+    except TypeError:
+        return []  # هیچ فراخوانی ثبت نشده
+    for p in extra:
+        stats.add(p)
+    stats.sort_stats("cumulative")
+    frames = []
+    for func in stats.fcn_list[:TOP_FRAMES]:
+        calls, _, self_time, cumulative, _ = stats.stats[func]
+        filename, line, name = func
+        frames.append(
+            f"{cumulative * 1000:8.1f}ms {self_time * 1000:8.1f}ms {calls:>6} "
+            f"{os.path.basename(filename)}:{line}({name})"
+        )
+    return frames
+
+
+def instrument(callback):
+    handler = callback.__name__
+
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        global _active
+        if _active or not _should_profile():
+            return await callback(update, context)
+
+        _active = True
+        extra = []
+        token = _thread_profiles.set(extra)
+        profile = cProfile.Profile()
+        started = time.perf_counter()
+        profile.enable()
+        try:
+            return await callback(update, context)
+        finally:
+            profile.disable()
+            _active = False
+            _thread_profiles.reset(token)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if SLOW_MS <= 0 or elapsed_ms >= SLOW_MS:
+                profiles.append({
+                    "handler": handler,
+                    "ms": round(elapsed_ms, 1),
+                    "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "frames": _top_frames(profile, extra),
+                })
+
+    return wrapper
+
+
+@contextmanager
+def thread_section():
+    """کاری که در thread دیگری برای update پروفایل‌شده انجام می‌شود را هم پروفایل می‌کند."""
+    extra = _thread_profiles.get()
+    if extra is None or not _PER_THREAD_PROFILES:
+        yield
+        return
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # پروفایلر دیگری فعال است؛ کار اصلی نباید به خاطر پروفایل شکست بخورد
+        yield
+        return
+    try:
+        yield
+    finally:
+        profile.disable()
+        extra.append(profile)
@@ -0,0 +1,93 @@
+import re
+import html
+
+MESSAGE_LIMIT = 4096  # محدودیت طول پیام تلگرام
+
+# تگ، entity، کلمه (با فاصله‌های بعدش)، فاصله یا کاراکتر تکی < و &
+_TOKEN = re.compile(r"<[^>]+>|&#?\w+;|[^<&\s]+\s*|\s+|[<&]")
+_TAG = re.compile(r"<(/?)(\w+)")
+
+
+def word_block(w, show_category=True):
+    index = w.get("index", "-")
+    word = html.escape(w.get("word") or "❓")
+    meaning = html.escape(w.get("meaning") or "❓")
+    lines = [f"{index}. <b>{word}</b> ➜ {meaning}"]
+    if show_category:
+        lines[0] += f" ({html.escape(w.get('category') or '❓بدون دسته‌بندی')})"
+    for ex in w.get("examples") or []:
+        lines.append(f"📝 {html.escape(ex)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def split_html(text, limit=MESSAGE_LIMIT):
+    """متن HTML بلندتر از limit را بدون شکستن تگ‌ها و entityها تکه‌تکه می‌کند.
+
+    هر تکه حداکثر limit کاراکتر است، با احتساب تگ‌هایی که در انتهایش بسته و در تکه بعد دوباره باز می‌شوند.
+    تگ‌های باز تا رسیدن متن بعدی کنار گذاشته می‌شوند تا تکه‌ای فقط با تگ خالی (مثل <b></b>) ساخته نشود.
+    """
+    chunks = []
+    parts, size = [], 0
+    open_tags = []  # تگ‌های بازِ داخل parts
+    pending = []  # تگ‌های بازی که هنوز متنی بعدشان نیامده: (token, name)
+    has_text = False
+
+    def closing(tags):
+        return "".join(f"</{t}>" for t in reversed(tags))
+
+    for m in _TOKEN.finditer(text):
+        token = m.group()
+        tag = _TAG.match(token) if token.startswith("<") and len(token) > 1 else None
+        if tag and not tag.group(1):
+            pending.append((token, tag.group(2)))
+            continue
+        if tag:
+            name = tag.group(2)
+            if pending and pending[-1][1] == name:
+                pending.pop()  # عنصر خالی
+            else:
+                if open_tags and open_tags[-1] == name:
+                    open_tags.pop()
+                parts.append(token)
+                size += len(token)
+            continue
+
+        pieces = [token]
+        if len(token) > limit // 2:
+            step = limit // 2
+            pieces = [token[i:i + step] for i in range(0, len(token), step)]
+
+        for piece in pieces:
+            opening = "".join(t for t, _ in pending)
+            after = open_tags + [name for _, name in pending]
+            if has_text and size + len(opening) + len(piece) + len(closing(after)) > limit:
+                chunks.append("".join(parts) + closing(open_tags))
+                parts = [f"<{t}>" for t in open_tags]
+                size = sum(map(len, parts))
+            parts.append(opening + piece)
+            size += len(opening) + len(piece)
+            open_tags, pending, has_text = after, [], True
+
+    parts += [t for t, _ in pending]
+    if has_text or not chunks:
+        chunks.append("".join(parts))
+    return chunks
+
+
+def chunk_messages(blocks, header="", limit=MESSAGE_LIMIT):
+    """بلوک‌ها را در پیام‌هایی با طول حداکثر limit می‌چیند (در زمان خطی)."""
+    messages = []
+    parts, size = [header], len(header)
+    # هر تکه با سرتیتر در یک پیام جا می‌شود، پس پیامی که فقط سرتیتر باشد فرستاده نمی‌شود
+    room = limit - len(header)
+    for block in blocks:
+        pieces = [block] if len(block) <= room else split_html(block, room)
+        for piece in pieces:
+            if len(parts) > 1 and size + len(piece) > limit:
+                messages.append("".join(parts))
+                parts, size = [""], 0
+            parts.append(piece)
+            size += len(piece)
+    if size:
+        messages.append("".join(parts))
+    return [m.strip() for m in messages if m.strip()]
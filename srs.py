@@ -0,0 +1,61 @@
+import time
+import heapq
+from datetime import datetime, timedelta, timezone
+
+# زمان‌بندی مرور به روش SM-2
+MIN_EASE = 1.3
+CORRECT_QUALITY = 4
+WRONG_QUALITY = 1
+RELEARN_DELAY = 60  # ثانیه؛ جواب غلط در همین جلسه دوباره پرسیده می‌شود
+
+
+def schedule(card, correct, now=None):
+    """فیلدهای جدید SM-2 برای یک کارت بعد از جواب درست/غلط."""
+    now = now or datetime.now(timezone.utc)
+    quality = CORRECT_QUALITY if correct else WRONG_QUALITY
+    ease = card.get("ease") or 2.5
+    interval = card.get("interval_days") or 0
+    reps = card.get("reps") or 0
+
+    if quality < 3:
+        reps = 0
+        interval = 1
+    else:
+        reps += 1
+        if reps == 1:
+            interval = 1
+        elif reps == 2:
+            interval = 6
+        else:
+            interval = round(interval * ease, 2)
+
+    ease = max(MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return {
+        "index": card["index"],
+        "ease": round(ease, 2),
+        "interval_days": interval,
+        "reps": reps,
+        "due_at": (now + timedelta(days=interval)).isoformat(),
+    }
+
+
+def _due_key(card):
+    due_at = card.get("due_at")
+    if not due_at:
+        return 0.0
+    return datetime.fromisoformat(due_at).timestamp()
+
+
+def new_queue(cards):
+    """min-heap جلسه: [زمان سررسید، موقعیت کارت]؛ عقب‌افتاده‌ترین کارت اول پرسیده می‌شود."""
+    queue = [[_due_key(card), pos] for pos, card in enumerate(cards)]
+    heapq.heapify(queue)
+    return queue
+
+
+def next_card(queue):
+    return heapq.heappop(queue)[1] if queue else None
+
+
+def requeue(queue, pos):
+    heapq.heappush(queue, [time.time() + RELEARN_DELAY, pos])
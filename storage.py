@@ -0,0 +1,451 @@
+import os
+import json
+import asyncio
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+import metrics
+
+# لایه ذخیره‌سازی کلمات؛ db.py (کش و API هندلرها) همه خواندن/نوشتن‌ها را به یکی از این دو می‌سپارد
+#   STORAGE_BACKEND=supabase  پیش‌فرض؛ PostgREST و RPCهای migrations/
+#   STORAGE_BACKEND=sqlite    فایل محلی (STORAGE_DB_PATH) برای استقرار تک‌کاربره، تست و بنچمارک آفلاین
+# هر دو متدهای async یکسان دارند و ردیف‌ها را به همان شکل (dict با examples به‌صورت list) برمی‌گردانند.
+
+
+class QuotaExceeded(Exception):
+    pass
+
+
+# ستون‌های لازم برای هر دستور؛ به‌جای select("*") فقط همین‌ها خوانده می‌شوند
+PROJECTIONS = {
+    "cache": "index,word,meaning,category,examples,updated_at",
+    "changes": "index,word,meaning,category,examples,updated_at,deleted_at",
+    "list": "index,word,meaning,category,examples",
+    "export": "index,word,meaning,category,examples",
+    "quiz": "index,word,meaning",
+    "review": "index,word,meaning,due_at,ease,interval_days,reps",
+    "lookup": "index,word",
+}
+
+
+def _is_quota_error(e):
+    return "word_quota_exceeded" in str(e)
+
+
+class SupabaseStorage:
+    """جدول words روی Supabase.
+
+    کلاینت supabase همزمان (sync) است؛ همه کوئری‌ها از طریق _run در یک thread جدا اجرا می‌شوند
+    تا event loop ربات در طول رفت‌وبرگشت PostgREST بلاک نشود.
+    خود کلاینت (و import سنگین supabase) تا اولین استفاده یا warm-up در post_init ساخته نمی‌شود.
+    """
+
+    def __init__(self, url=None, key=None, client=None):
+        self.url = url
+        self.key = key
+        self._client = client
+        self._client_lock = threading.Lock()
+
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from supabase import create_client
+                    self._client = create_client(self.url, self.key)
+        return self._client
+
+    async def connect(self):
+        await asyncio.to_thread(self.client)
+
+    async def _run(self, build):
+        # build(client) کوئری را می‌سازد؛ هم ساختن کلاینت (import و create_client) و هم خود کوئری
+        # در thread کمکی انجام می‌شود تا event loop حتی در اولین درخواست بلاک نشود
+        call = "?"
+
+        def execute():
+            nonlocal call
+            query = build(self.client())
+            call = f"{getattr(query, 'http_method', '?')} {getattr(query, 'path', '?')}"
+            return query.execute()
+
+        started = time.perf_counter()
+        metrics.count_round_trip("supabase")
+        try:
+            response = await asyncio.to_thread(execute)
+        except Exception:
+            metrics.inc("bot_supabase_errors_total", call=call)
+            raise
+        finally:
+            metrics.observe("bot_supabase_request_seconds", time.perf_counter() - started, call=call)
+        return response.data
+
+    async def _rpc(self, fn, params):
+        return await self._run(lambda c: c.rpc(fn, params))
+
+    @staticmethod
+    def _select(c, projection):
+        # کلمه‌های حذف نرم‌شده (migrations/0009_delta_sync.sql) فقط در get_changed_words دیده می‌شوند
+        return c.from_("words").select(PROJECTIONS[projection]).is_("deleted_at", "null")
+
+    async def get_words(self, user_id):
+        return await self._run(lambda c: self._select(c, "cache").eq("user_id", user_id).order("index"))
+
+    async def get_changed_words(self, user_id, cursor):
+        # ایندکس (user_id, updated_at)؛ >= چون چند ردیف ممکن است همان زمان cursor را داشته باشند
+        return await self._run(
+            lambda c: c.from_("words").select(PROJECTIONS["changes"])
+            .eq("user_id", user_id)
+            .gte("updated_at", cursor)
+            .order("updated_at")
+        )
+
+    async def get_words_page(self, user_id, category, after, before, limit, projection):
+        def build(c):
+            query = self._select(c, projection).eq("user_id", user_id)
+            if category:
+                query = query.eq("category", category)
+            if before is not None:
+                return query.lt("index", before).order("index", desc=True).limit(limit + 1)
+            if after is not None:
+                query = query.gt("index", after)
+            return query.order("index").limit(limit + 1)
+
+        data = await self._run(build)
+        if before is not None:
+            return data[:limit][::-1], len(data) > limit, True
+        return data[:limit], after is not None, len(data) > limit
+
+    async def random_words(self, user_id, count):
+        return await self._rpc("random_words", {"p_user_id": user_id, "p_count": count})
+
+    async def due_words(self, user_id, now, count):
+        # از ایندکس (user_id, due_at) استفاده می‌کند؛ فقط کلمه‌های سررسیدشده خوانده می‌شوند
+        return await self._run(
+            lambda c: self._select(c, "review")
+            .eq("user_id", user_id)
+            .lte("due_at", now)
+            .order("due_at")
+            .limit(count)
+        )
+
+    async def apply_reviews(self, user_id, reviews):
+        return await self._rpc("apply_reviews", {"p_user_id": user_id, "p_reviews": reviews})
+
+    async def get_word(self, user_id, index, projection):
+        data = await self._run(
+            lambda c: self._select(c, projection).eq("user_id", user_id).eq("index", index).limit(1)
+        )
+        return data[0] if data else None
+
+    async def find_word(self, user_id, word, projection):
+        data = await self._run(
+            lambda c: self._select(c, projection)
+            .eq("user_id", user_id)
+            .eq("word", word)
+            .order("index")
+            .limit(1)
+        )
+        return data[0] if data else None
+
+    async def get_words_by_indexes(self, user_id, indexes, projection):
+        return await self._run(
+            lambda c: self._select(c, projection)
+            .eq("user_id", user_id)
+            .in_("index", sorted(indexes))
+            .order("index")
+        )
+
+    async def insert_word(self, user_id, word, meaning, category, max_words):
+        # index در دیتابیس تخصیص داده می‌شود (migrations/0001_insert_word.sql): یک رفت‌وبرگشت، بدون race
+        # سقف کلمه‌ها هم در همان تابع بررسی می‌شود (migrations/0006_word_quota.sql)
+        try:
+            data = await self._rpc("insert_word", {
+                "p_user_id": user_id,
+                "p_word": word,
+                "p_meaning": meaning,
+                "p_category": category,
+                "p_max_words": max_words,
+            })
+        except Exception as e:
+            if _is_quota_error(e):
+                raise QuotaExceeded(max_words) from e
+            raise
+        return data[0] if data else None
+
+    async def insert_words_bulk(self, user_id, rows, max_words):
+        # رزرو index و درج همه ردیف‌ها در یک تراکنش (migrations/0010_insert_words.sql): یا همه یا هیچ،
+        # تا شکست وسط کار ردیف‌های نیمه‌کاره‌ای نگذارد که تلاش دوباره آن‌ها را تکراری وارد کند
+        try:
+            return await self._rpc("insert_words", {
+                "p_user_id": user_id,
+                "p_rows": rows,
+                "p_max_words": max_words,
+            })
+        except Exception as e:
+            if _is_quota_error(e):
+                raise QuotaExceeded(max_words) from e
+            raise
+
+    async def append_example(self, user_id, index, example):
+        return await self._rpc("append_example", {
+            "p_user_id": user_id,
+            "p_index": index,
+            "p_example": example,
+        })
+
+    async def load_user_states(self):
+        data = await self._run(lambda c: c.from_("bot_user_state").select("user_id,data"))
+        return {int(row["user_id"]): row["data"] for row in data}
+
+    async def save_user_states(self, states):
+        rows = [{"user_id": str(user_id), "data": data} for user_id, data in states.items()]
+        await self._run(lambda c: c.from_("bot_user_state").upsert(rows))
+
+    async def delete_user_states(self, user_ids):
+        ids = [str(u) for u in user_ids]
+        await self._run(lambda c: c.from_("bot_user_state").delete().in_("user_id", ids))
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS words (
+    user_id TEXT NOT NULL,
+    "index" INTEGER NOT NULL,
+    word TEXT NOT NULL,
+    meaning TEXT NOT NULL,
+    category TEXT,
+    examples TEXT NOT NULL DEFAULT '[]',
+    due_at TEXT NOT NULL,
+    ease REAL NOT NULL DEFAULT 2.5,
+    interval_days REAL NOT NULL DEFAULT 0,
+    reps INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT NOT NULL DEFAULT '',
+    deleted_at TEXT,
+    PRIMARY KEY (user_id, "index")
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS words_user_id_category_index_idx ON words (user_id, category, "index");
+CREATE INDEX IF NOT EXISTS words_user_id_word_idx ON words (user_id, word);
+CREATE INDEX IF NOT EXISTS words_user_id_due_at_idx ON words (user_id, due_at);
+CREATE INDEX IF NOT EXISTS words_user_id_updated_at_idx ON words (user_id, updated_at);
+CREATE TRIGGER IF NOT EXISTS words_touch_updated_at AFTER UPDATE ON words
+FOR EACH ROW WHEN NEW.updated_at = OLD.updated_at
+BEGIN
+    UPDATE words SET updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')
+    WHERE user_id = NEW.user_id AND "index" = NEW."index";
+END;
+CREATE VIEW IF NOT EXISTS live_words AS SELECT * FROM words WHERE deleted_at IS NULL;
+CREATE TABLE IF NOT EXISTS word_counters (
+    user_id TEXT PRIMARY KEY,
+    last_index INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bot_user_state (
+    user_id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+
+def _columns(projection):
+    return ", ".join(f'"{c}"' for c in PROJECTIONS[projection].split(","))
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class SQLiteStorage:
+    """جدول words در یک فایل SQLite محلی (WAL)، با همان ایندکس‌های migrations/.
+
+    همه دستورها پارامتری و با متن ثابت هستند تا sqlite3 آن‌ها را یک بار prepare و cache کند.
+    یک اتصال مشترک با قفل سریالی می‌شود و کوئری‌ها در thread جدا اجرا می‌شوند.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.queries = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, cached_statements=256)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._add_columns()
+        self._conn.executescript(SQLITE_SCHEMA)
+
+    def _add_columns(self):
+        # فایل‌هایی که قبل از ستون‌های همگام‌سازی تدریجی ساخته شده‌اند
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(words)")}
+        if columns and "updated_at" not in columns:
+            self._conn.execute("ALTER TABLE words ADD COLUMN updated_at TEXT NOT NULL DEFAULT ''")
+            self._conn.execute("ALTER TABLE words ADD COLUMN deleted_at TEXT")
+            self._conn.commit()
+
+    async def connect(self):
+        pass
+
+    async def _run(self, fn, *args):
+        def call():
+            with self._lock:
+                self.queries += 1
+                with self._conn:
+                    return fn(*args)
+        return await asyncio.to_thread(call)
+
+    @staticmethod
+    def _row(row):
+        word = dict(row)
+        if "examples" in word:
+            word["examples"] = json.loads(word["examples"])
+        return word
+
+    def _fetch(self, sql, params):
+        return [self._row(r) for r in self._conn.execute(sql, params).fetchall()]
+
+    async def get_words(self, user_id):
+        sql = f'SELECT {_columns("cache")} FROM live_words WHERE user_id = ? ORDER BY "index"'
+        return await self._run(self._fetch, sql, (user_id,))
+
+    async def get_changed_words(self, user_id, cursor):
+        sql = f'SELECT {_columns("changes")} FROM words WHERE user_id = ? AND updated_at >= ? ORDER BY updated_at'
+        return await self._run(self._fetch, sql, (user_id, cursor))
+
+    async def get_words_page(self, user_id, category, after, before, limit, projection):
+        where, params = "user_id = ?", [user_id]
+        if category:
+            where += " AND category = ?"
+            params.append(category)
+        if before is not None:
+            sql = (f'SELECT {_columns(projection)} FROM live_words '
+                   f'WHERE {where} AND "index" < ? ORDER BY "index" DESC LIMIT ?')
+            data = await self._run(self._fetch, sql, (*params, before, limit + 1))
+            return data[:limit][::-1], len(data) > limit, True
+        if after is not None:
+            where += ' AND "index" > ?'
+            params.append(after)
+        sql = f'SELECT {_columns(projection)} FROM live_words WHERE {where} ORDER BY "index" LIMIT ?'
+        data = await self._run(self._fetch, sql, (*params, limit + 1))
+        return data[:limit], after is not None, len(data) > limit
+
+    async def random_words(self, user_id, count):
+        sql = f'SELECT {_columns("quiz")} FROM live_words WHERE user_id = ? ORDER BY random() LIMIT ?'
+        return await self._run(self._fetch, sql, (user_id, count))
+
+    async def due_words(self, user_id, now, count):
+        sql = f'SELECT {_columns("review")} FROM live_words WHERE user_id = ? AND due_at <= ? ORDER BY due_at LIMIT ?'
+        return await self._run(self._fetch, sql, (user_id, now, count))
+
+    def _apply_reviews(self, user_id, reviews):
+        cursor = self._conn.executemany(
+            'UPDATE words SET due_at = ?, ease = ?, interval_days = ?, reps = ? WHERE user_id = ? AND "index" = ?',
+            [(r["due_at"], r["ease"], r["interval_days"], r["reps"], user_id, r["index"]) for r in reviews],
+        )
+        return cursor.rowcount
+
+    async def apply_reviews(self, user_id, reviews):
+        return await self._run(self._apply_reviews, user_id, reviews)
+
+    async def get_word(self, user_id, index, projection):
+        sql = f'SELECT {_columns(projection)} FROM live_words WHERE user_id = ? AND "index" = ?'
+        data = await self._run(self._fetch, sql, (user_id, index))
+        return data[0] if data else None
+
+    async def find_word(self, user_id, word, projection):
+        sql = f'SELECT {_columns(projection)} FROM live_words WHERE user_id = ? AND word = ? ORDER BY "index" LIMIT 1'
+        data = await self._run(self._fetch, sql, (user_id, word))
+        return data[0] if data else None
+
+    async def get_words_by_indexes(self, user_id, indexes, projection):
+        # یک آرایه JSON به‌جای تعداد متغیر "?"، تا متن دستور ثابت بماند و از cache استفاده شود
+        sql = (f'SELECT {_columns(projection)} FROM live_words '
+               f'WHERE user_id = ? AND "index" IN (SELECT value FROM json_each(?)) ORDER BY "index"')
+        return await self._run(self._fetch, sql, (user_id, json.dumps(sorted(indexes))))
+
+    def _reserve(self, user_id, count, max_words):
+        if max_words is not None:
+            (current,) = self._conn.execute("SELECT count(*) FROM live_words WHERE user_id = ?", (user_id,)).fetchone()
+            if current + count > max_words:
+                raise QuotaExceeded(max_words)
+        self._conn.execute(
+            "INSERT INTO word_counters (user_id, last_index) "
+            "SELECT ?, coalesce(max(\"index\"), 0) FROM words WHERE user_id = ? "
+            "ON CONFLICT(user_id) DO NOTHING",
+            (user_id, user_id),
+        )
+        self._conn.execute(
+            "UPDATE word_counters SET last_index = last_index + ? WHERE user_id = ?", (count, user_id)
+        )
+        (last,) = self._conn.execute(
+            "SELECT last_index FROM word_counters WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return last - count + 1
+
+    def _insert(self, user_id, rows, max_words):
+        first = self._reserve(user_id, len(rows), max_words)
+        due_at = _now()
+        self._conn.executemany(
+            'INSERT INTO words (user_id, "index", word, meaning, category, examples, due_at, updated_at) '
+            "VALUES (?, ?, ?, ?, ?, ?, ?, strftime('%Y-%m-%dT%H:%M:%f', 'now'))",
+            [
+                (user_id, first + i, row["word"], row["meaning"], row.get("category"),
+                 json.dumps(row.get("examples") or [], ensure_ascii=False), due_at)
+                for i, row in enumerate(rows)
+            ],
+        )
+        return first
+
+    def _insert_word(self, user_id, word, meaning, category, max_words):
+        index = self._insert(user_id, [{"word": word, "meaning": meaning, "category": category}], max_words)
+        sql = f'SELECT {_columns("cache")} FROM words WHERE user_id = ? AND "index" = ?'
+        return self._fetch(sql, (user_id, index))[0]
+
+    async def insert_word(self, user_id, word, meaning, category, max_words):
+        return await self._run(self._insert_word, user_id, word, meaning, category, max_words)
+
+    async def insert_words_bulk(self, user_id, rows, max_words):
+        # کل فایل در یک تراکنش درج می‌شود: یا همه یا هیچ
+        return await self._run(self._insert, user_id, rows, max_words)
+
+    def _append_example(self, user_id, index, example):
+        row = self._conn.execute(
+            'SELECT examples FROM words WHERE user_id = ? AND "index" = ?', (user_id, index)
+        ).fetchone()
+        if row is None:
+            return None
+        examples = json.loads(row["examples"]) + [example]
+        self._conn.execute(
+            'UPDATE words SET examples = ? WHERE user_id = ? AND "index" = ?',
+            (json.dumps(examples, ensure_ascii=False), user_id, index),
+        )
+        return len(examples)
+
+    async def append_example(self, user_id, index, example):
+        return await self._run(self._append_example, user_id, index, example)
+
+    def _load_user_states(self):
+        rows = self._conn.execute("SELECT user_id, data FROM bot_user_state").fetchall()
+        return {row["user_id"]: json.loads(row["data"]) for row in rows}
+
+    async def load_user_states(self):
+        return await self._run(self._load_user_states)
+
+    def _save_user_states(self, states):
+        self._conn.executemany(
+            "INSERT INTO bot_user_state (user_id, data) VALUES (?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET data = excluded.data",
+            [(user_id, json.dumps(data, ensure_ascii=False)) for user_id, data in states.items()],
+        )
+
+    async def save_user_states(self, states):
+        await self._run(self._save_user_states, states)
+
+    def _delete_user_states(self, user_ids):
+        self._conn.executemany("DELETE FROM bot_user_state WHERE user_id = ?", [(u,) for u in user_ids])
+
+    async def delete_user_states(self, user_ids):
+        await self._run(self._delete_user_states, user_ids)
+
+
+def create_storage(url=None, key=None):
+    backend = os.getenv("STORAGE_BACKEND", "supabase")
+    if backend == "sqlite":
+        return SQLiteStorage(os.getenv("STORAGE_DB_PATH", "words.sqlite3"))
+    return SupabaseStorage(url, key)
@@ -0,0 +1,46 @@
+import asyncio
+import unittest
+
+import db
+import storage
+from cache import WordCache
+from bench.fakes import FakeSupabase, synthetic_words
+
+
+class MergeAfterEvictionTest(unittest.TestCase):
+    def setUp(self):
+        self._cache, self._backend = db.cache, db.backend
+        fake = FakeSupabase()
+        fake.tables["words"] = synthetic_words("1", 100, ["Nomen"]) + synthetic_words("2", 100, ["Verb"])
+        db.backend = storage.SupabaseStorage(client=fake)
+        db.cache = WordCache(max_rows=150)
+
+    def tearDown(self):
+        db.cache, db.backend = self._cache, self._backend
+
+    def test_merge_returns_none_for_evicted_user(self):
+        cache = WordCache()
+        self.assertIsNone(cache.merge("1", [], "c", "c"))
+
+    def test_stale_user_evicted_during_delta_fetch(self):
+        get_changed_words = db.backend.get_changed_words
+        loaded = []
+
+        async def changed_after_other_user_loads(user_id, cursor):
+            # بار سرد کاربر دیگر در همین فاصله کش کاربر 1 را evict می‌کند
+            loaded.append(await db.get_words(2))
+            return await get_changed_words(user_id, cursor)
+
+        async def run():
+            await db.get_words(1)
+            db.cache.expire("1")
+            db.backend.get_changed_words = changed_after_other_user_loads
+            return await db.get_words(1)
+
+        words = asyncio.run(run())
+        self.assertEqual(len(words), 100)
+        self.assertEqual(len(loaded[0]), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import random
+import unittest
+
+import render
+
+
+def _fuzz_html(rng):
+    tokens = []
+    for _ in range(rng.randint(1, 400)):
+        kind = rng.random()
+        if kind < 0.15:
+            tag = rng.choice("bius")
+            tokens.append(f"<{tag}>{'y' * rng.randint(0, 300)}</{tag}>")
+        elif kind < 0.25:
+            tokens.append(rng.choice(["&amp;", "&lt;", "&#123;"]))
+        elif kind < 0.3:
+            tokens.append("z" * rng.randint(1, 5000))
+        else:
+            tokens.append("w" * rng.randint(1, 20) + rng.choice([" ", "\n", ""]))
+    return "".join(tokens)
+
+
+class SplitHtmlTest(unittest.TestCase):
+    def test_reported_cases_fit(self):
+        for text in ("x" * 4090 + "<b>" + "y" * 20 + "</b>", "a" * 4093 + "<b>" + "y" * 5000 + "</b>"):
+            chunks = render.split_html(text)
+            self.assertTrue(all(len(c) <= render.MESSAGE_LIMIT for c in chunks))
+            self.assertFalse(any("<b></b>" in c for c in chunks))
+
+    def test_fuzzed_chunks_fit_limit(self):
+        rng = random.Random(7)
+        for _ in range(300):
+            limit = rng.choice([64, 200, 1000, render.MESSAGE_LIMIT])
+            text = _fuzz_html(rng)
+            chunks = render.split_html(text, limit)
+            self.assertTrue(all(len(c) <= limit for c in chunks), limit)
+            self.assertFalse(any(c.replace("<b>", "").replace("</b>", "").replace("<i>", "").replace("</i>", "")
+                                 .replace("<u>", "").replace("</u>", "").replace("<s>", "").replace("</s>", "") == ""
+                                 for c in chunks))
+
+    def test_chunk_messages_never_sends_header_alone(self):
+        rng = random.Random(11)
+        header = "📚 <b>کلمه‌های ذخیره‌شده:</b>\n\n"
+        for _ in range(100):
+            limit = rng.choice([200, 1000, render.MESSAGE_LIMIT])
+            blocks = [_fuzz_html(rng)[:rng.randint(1, 3 * limit)] for _ in range(rng.randint(1, 5))]
+            messages = render.chunk_messages(blocks, header, limit)
+            self.assertTrue(all(len(m) <= limit for m in messages))
+            self.assertNotEqual(messages[0], header.strip())
+
+
+if __name__ == "__main__":
+    unittest.main()
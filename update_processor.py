@@ -0,0 +1,52 @@
+import sys
+import asyncio
+from contextlib import asynccontextmanager
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+class UserLaneUpdateProcessor(BaseUpdateProcessor):
+    """updateهای کاربران مختلف همزمان پردازش می‌شوند، ولی updateهای یک کاربر به ترتیب و پشت سر هم.
+
+    برای هر کاربر یک قفل (lane) ساخته می‌شود و وقتی دیگر کسی منتظرش نیست حذف می‌شود.
+    asyncio.Lock به ترتیب ورود (FIFO) قفل را می‌دهد، پس ترتیب پیام‌های هر کاربر حفظ می‌شود.
+    """
+
+    def __init__(self, max_concurrent_updates):
+        # semaphore پایه قبل از do_process_update گرفته می‌شود؛ آن‌وقت updateهای منتظر در lane یک کاربر
+        # (مثلاً چند کلیک حین /exportall) همه جاهای خالی را پر می‌کردند و بقیه کاربران بلاک می‌شدند.
+        # پس سقف پایه عملاً بی‌اثر است و سقف واقعی بعد از گرفتن نوبت کاربر اعمال می‌شود.
+        super().__init__(sys.maxsize)
+        self._slots = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._lanes = {}  # user_id -> [lock, تعداد update در صف یا در حال اجرا]
+
+    @asynccontextmanager
+    async def _lane(self, update):
+        user = update.effective_user if isinstance(update, Update) else None
+        if user is None:
+            yield
+            return
+
+        lane = self._lanes.get(user.id)
+        if lane is None:
+            lane = self._lanes[user.id] = [asyncio.Lock(), 0]
+        lane[1] += 1
+        try:
+            async with lane[0]:
+                yield
+        finally:
+            lane[1] -= 1
+            if lane[1] == 0:
+                del self._lanes[user.id]
+
+    async def do_process_update(self, update, coroutine):
+        # اول نوبت کاربر، بعد جای سراسری: فقط update در حال اجرا یکی از limit جا را اشغال می‌کند
+        async with self._lane(update):
+            async with self._slots:
+                await coroutine
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,79 @@
+import os
+import hmac
+import json
+import signal
+import asyncio
+import tornado.web
+import tornado.httpserver
+from telegram import Update
+
+import metrics
+
+# سرور HTTP خود ربات: به‌جای run_webhook، هم webhook تلگرام و هم /metrics روی همان پورت سرو می‌شوند
+# (روی پلن رایگان Render فقط یک پورت در دسترس است).
+# /metrics فقط وقتی METRICS_TOKEN تنظیم شده باشد فعال است و آن توکن را می‌خواهد:
+#   Authorization: Bearer <METRICS_TOKEN>   (bearer_token در Prometheus)  یا  /metrics?token=<METRICS_TOKEN>
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+
+class WebhookHandler(tornado.web.RequestHandler):
+    def initialize(self, bot_app):
+        self.bot_app = bot_app
+
+    async def post(self):
+        try:
+            data = json.loads(self.request.body)
+        except ValueError:
+            self.set_status(400)
+            return
+        await self.bot_app.update_queue.put(Update.de_json(data, self.bot_app.bot))
+        self.set_status(200)
+
+
+class MetricsHandler(tornado.web.RequestHandler):
+    def initialize(self, token):
+        self.token = token
+
+    def _authorized(self):
+        header = self.request.headers.get("Authorization", "")
+        supplied = header[len("Bearer "):] if header.startswith("Bearer ") else self.get_query_argument("token", "")
+        return hmac.compare_digest(supplied.encode(), self.token.encode())
+
+    def get(self):
+        if not self._authorized():
+            # 404 به‌جای 401 تا وجود مسیر هم معلوم نشود
+            raise tornado.web.HTTPError(404)
+        self.set_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.write(metrics.render())
+
+
+def make_web_app(bot_app, webhook_path, metrics_token=None):
+    metrics_token = METRICS_TOKEN if metrics_token is None else metrics_token
+    routes = [(webhook_path, WebhookHandler, {"bot_app": bot_app})]
+    if metrics_token:
+        routes.append(("/metrics", MetricsHandler, {"token": metrics_token}))
+    return tornado.web.Application(routes)
+
+
+async def serve(bot_app, listen, port, webhook_path, webhook_url):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # ویندوز: Ctrl+C با KeyboardInterrupt متوقف می‌کند
+
+    async with bot_app:
+        if bot_app.post_init:
+            await bot_app.post_init(bot_app)
+        await bot_app.bot.set_webhook(url=webhook_url, allowed_updates=Update.ALL_TYPES)
+        await bot_app.start()
+
+        server = tornado.httpserver.HTTPServer(make_web_app(bot_app, webhook_path))
+        server.listen(port, address=listen)
+        try:
+            await stop.wait()
+        finally:
+            server.stop()
+            await bot_app.stop()